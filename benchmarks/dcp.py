@@ -0,0 +1,103 @@
+"""Benchmark of DCP, the leaf x class contingency table against the former
+loop over all pairs of rows.
+
+The loop is quadratic, it is timed on --loop-rows rows only (both must give
+the same values there), the contingency table on --rows rows.
+
+    python benchmarks/dcp.py --rows 100000 --loop-rows 1500
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.tree import DecisionTreeClassifier
+
+from pv056_2019.outlier_detection.DCP import DCPMetric
+
+
+def loop_dcp(estimator, df, classes):
+    """countDCP before the contingency table."""
+    values = np.empty([0, 0])
+
+    leafsIndexes = estimator.apply(df, check_input=True)
+
+    for index, _ in df.iterrows():
+        suma = 0
+        value = 0
+        for leafIndex, _ in df.iterrows():
+            if leafsIndexes[index] == leafsIndexes[leafIndex]:
+                suma += 1
+                if classes[index] == classes[leafIndex]:
+                    value += 1
+        values = np.append(values, np.full((1, 1), (value / suma) * -1))
+
+    return values
+
+
+def synthetic_data(rows, columns, n_classes, random):
+    df = pd.DataFrame(random.randn(rows, columns))
+    noise = random.randn(rows) * 2
+    classes = pd.Series(
+        np.digitize(df[0] + df[1] + noise, np.linspace(-2, 2, n_classes - 1))
+    )
+    return df, classes
+
+
+def fit_tree(df, classes, min_impurity_split):
+    # sklearn >= 0.24 does not have min_impurity_split, its default tree is
+    # built instead
+    if "min_impurity_split" in DecisionTreeClassifier().get_params():
+        estimator = DecisionTreeClassifier(min_impurity_split=min_impurity_split)
+    else:
+        estimator = DecisionTreeClassifier()
+    return estimator.fit(df, classes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of DCP")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--loop-rows", type=int, default=1500)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--classes", type=int, default=3)
+    parser.add_argument("--min-impurity-split", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random = np.random.RandomState(args.seed)
+
+    df, classes = synthetic_data(args.loop_rows, args.columns, args.classes, random)
+    estimator = fit_tree(df, classes, args.min_impurity_split)
+    start = time.time()
+    expected = loop_dcp(estimator, df, classes)
+    loop_time = time.time() - start
+    start = time.time()
+    values = DCPMetric.sameClassFractions(estimator, df, classes)
+    table_time = time.time() - start
+    print(
+        "{} rows: loop {:.2f}s, contingency table {:.3f}s, same values: {}".format(
+            args.loop_rows, loop_time, table_time, np.allclose(values, expected)
+        )
+    )
+
+    df, classes = synthetic_data(args.rows, args.columns, args.classes, random)
+    start = time.time()
+    estimator = fit_tree(df, classes, args.min_impurity_split)
+    fit_time = time.time() - start
+    start = time.time()
+    DCPMetric.sameClassFractions(estimator, df, classes)
+    table_time = time.time() - start
+    print(
+        "{} rows: tree fit {:.2f}s, contingency table {:.3f}s, "
+        "loop estimate {:.0f}s".format(
+            args.rows,
+            fit_time,
+            table_time,
+            loop_time * (args.rows / args.loop_rows) ** 2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark of the approximate nearest neighbours backend ("approximate")
+against an exact one of sklearn (--exact, "auto" by default) on one-hot
+encoded clustered data, the kind of matrix the detectors get from many
+nominal attributes.
+
+Reports the time of the neighbour search and of the LOF, NearestNeighbors
+and KDN scores with both backends, the recall of the approximate
+neighbours and the Spearman correlation of the approximate and exact scores.
+
+    python benchmarks/neighbors.py --rows 20000 --attributes 35 --values 7
+"""
+
+import argparse
+import time
+
+import numpy as np
+from scipy.stats import spearmanr
+from sklearn.neighbors import LocalOutlierFactor
+
+from pv056_2019.outlier_detection.LOF import LOFMetric
+from pv056_2019.outlier_detection.neighbors import APPROXIMATE, kneighbors
+
+
+def clustered_one_hot(rows, attributes, values, clusters, noise, random):
+    """One-hot encoded nominal attributes of rows around random prototypes,
+    the class of a row is its cluster."""
+    prototypes = random.randint(0, values, (clusters, attributes))
+    labels = random.randint(0, clusters, rows)
+    categories = prototypes[labels]
+    changed = random.rand(rows, attributes) < noise
+    categories[changed] = random.randint(0, values, changed.sum())
+    one_hot = np.zeros((rows, attributes * values))
+    one_hot[
+        np.arange(rows)[:, np.newaxis], np.arange(attributes) * values + categories
+    ] = 1
+    return one_hot, labels
+
+
+def timed(function, *args, **kwargs):
+    start = time.time()
+    result = function(*args, **kwargs)
+    return result, time.time() - start
+
+
+def scores(values, classes, k, algorithm):
+    """Neighbours and the LOF, NearestNeighbors and KDN scores with their
+    times, the way the detectors compute them."""
+    (distances, indices), search_time = timed(
+        kneighbors, values, k, algorithm=algorithm
+    )
+    if algorithm == APPROXIMATE:
+        lof, lof_time = timed(
+            LOFMetric().countLOF, values, n_neighbors=k, algorithm=algorithm
+        )
+    else:
+        # Scores of the training rows, as the LOF detector computes them
+        estimator = LocalOutlierFactor(n_neighbors=k, algorithm=algorithm, novelty=True)
+        lof, lof_time = timed(lambda: estimator.fit(values).decision_function(values))
+    return (
+        indices,
+        {
+            "LOF": (lof, lof_time),
+            "NN": (np.mean(distances, axis=1), search_time),
+            "KDN": (
+                np.mean(classes[indices] != classes[:, np.newaxis], axis=1),
+                search_time,
+            ),
+        },
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of nearest neighbours")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--attributes", type=int, default=35)
+    parser.add_argument("--values", type=int, default=7)
+    parser.add_argument("--clusters", type=int, default=20)
+    parser.add_argument("--noise", type=float, default=0.4)
+    parser.add_argument("-k", "--n-neighbors", type=int, default=10)
+    parser.add_argument("--exact", default="auto")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random = np.random.RandomState(args.seed)
+    values, classes = clustered_one_hot(
+        args.rows, args.attributes, args.values, args.clusters, args.noise, random
+    )
+    print("{} rows, {} columns, k={}".format(*values.shape, args.n_neighbors))
+
+    exact_indices, exact = scores(values, classes, args.n_neighbors, args.exact)
+    indices, approximate = scores(values, classes, args.n_neighbors, APPROXIMATE)
+
+    recall = np.mean(
+        [
+            len(np.intersect1d(found, true)) / args.n_neighbors
+            for found, true in zip(indices, exact_indices)
+        ]
+    )
+    print("Recall of the approximate neighbours: {:.3f}".format(recall))
+    for name in exact:
+        exact_scores, exact_time = exact[name]
+        approximate_scores, approximate_time = approximate[name]
+        print(
+            "{}: exact {:.2f}s, approximate {:.2f}s, Spearman {:.3f}".format(
+                name,
+                exact_time,
+                approximate_time,
+                spearmanr(exact_scores, approximate_scores)[0],
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,75 @@ import argparse
 import json
 import os
 import sys
+import time
+import traceback
 from hashlib import md5
-from multiprocessing import Process, Queue
+from typing import Any, List
 
+import numpy as np
+
+from pv056_2019.arff_cache import BINARIZED_CACHE
 from pv056_2019.data_loader import DataLoader
+from pv056_2019.manifest import Manifest, inputs_hash
+from pv056_2019.pool import (
+    STATUS_ERROR,
+    STATUS_OK,
+    STDERR_TAIL_SIZE,
+    JobResult,
+    self_peak_rss,
+)
+from pv056_2019.scheduler import CostScheduler
 from pv056_2019.schemas import ODStepConfigSchema
+from pv056_2019.utils import ID_NAME, OD_SCORES_SUFFIX, OD_VALUE_NAME
+
+
+def od_file_path(
+    train_od_dir: str, train_file_path: str, hex_name: str, suffix: str = "_train.arff"
+) -> str:
+    file_basename = os.path.basename(train_file_path)
+    file_name = file_basename.replace("_train.arff", "_" + hex_name + suffix)
+    return os.path.join(train_od_dir, file_name)
+
+
+_CONF: Any = None
+
+
+def init_od_worker(conf: ODStepConfigSchema):
+    global _CONF
+    _CONF = conf
+    BINARIZED_CACHE.directory = conf.binarized_cache_dir
 
 
-def od_worker(queue: Queue):
-    while not queue.empty():
-        od_settings, train_file_path, file_save_path = queue.get()
+def failed_od_results(task, status: str, message: str) -> List[JobResult]:
+    _, od_tasks = task
+    return [
+        JobResult(hex_name, file_save_path, job_hash, status, 0.0, None, message)
+        for _, file_save_path, hex_name, job_hash in od_tasks
+    ]
+
+
+def od_worker(task) -> List[JobResult]:
+    conf = _CONF
+    train_file_path, od_tasks = task
+
+    try:
+        dataframe = DataLoader._load_arff_file(
+            train_file_path, conf.arff_cache_dir, conf.arff_reader
+        )
+    except Exception as exc:
+        print(
+            "Error:\n\t{}\n\t".format(os.path.basename(train_file_path)),
+            exc,
+            file=sys.stderr,
+            flush=True,
+        )
+        return failed_od_results(task, STATUS_ERROR, traceback.format_exc())
+
+    results = []
+    for od_settings, file_save_path, hex_name, job_hash in od_tasks:
+        start_time = time.time()
+        status = STATUS_OK
+        stderr_tail = ""
         print(
             od_settings.name + ":",
             os.path.basename(train_file_path),
@@ -21,10 +80,21 @@ def od_worker(queue: Queue):
         )
 
         try:
-            dataframe = DataLoader._load_arff_file(train_file_path)
-            od_frame = dataframe.apply_outlier_detector(od_settings)
-            od_frame.arff_dump(file_save_path)
+            if conf.od_output == "scores":
+                detector = dataframe.compute_outlier_scores(od_settings)
+                np.savez(
+                    file_save_path,
+                    **{
+                        ID_NAME: dataframe[ID_NAME].values,
+                        OD_VALUE_NAME: detector.values,
+                    }
+                )
+            else:
+                od_frame = dataframe.apply_outlier_detector(od_settings)
+                od_frame.arff_dump(file_save_path)
         except Exception as exc:
+            status = STATUS_ERROR
+            stderr_tail = traceback.format_exc()[-STDERR_TAIL_SIZE:]
             print(
                 "Error:\n\t{} {}\n\t".format(
                     od_settings.name, os.path.basename(train_file_path)
@@ -34,12 +104,31 @@ def od_worker(queue: Queue):
                 flush=True,
             )
 
+        results.append(
+            JobResult(
+                hex_name,
+                file_save_path,
+                job_hash,
+                status,
+                time.time() - start_time,
+                self_peak_rss(),
+                stderr_tail,
+            )
+        )
+
+    return results
+
 
 def main():
     parser = argparse.ArgumentParser(
         description="Apply outlier detection methods to training data"
     )
     parser.add_argument("--config-file", "-c", required=True, help="JSON configuration")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="run all jobs, even those completed by a previous run",
+    )
 
     args = vars(parser.parse_args())
 
@@ -48,30 +137,64 @@ def main():
 
     train_data_loader = DataLoader(conf.train_split_dir, regex=r".*_train\.arff")
 
-    queue = Queue()
-
+    od_methods = []
     for od_settings in conf.od_methods:
         hex_name = md5(od_settings.json(sort_keys=True).encode("UTF-8")).hexdigest()
         config_save_path = os.path.join(conf.train_od_dir, hex_name + ".json")
         with open(config_save_path, "w") as out_config:
             out_config.write(od_settings.json(sort_keys=True))
 
-        for train_file_path in train_data_loader.file_paths:
-            file_basename = os.path.basename(train_file_path)
-            file_name = file_basename.replace(
-                "_train.arff", "_" + hex_name + "_train.arff"
-            )
-            file_save_path = os.path.join(conf.train_od_dir, file_name)
+        od_methods.append((od_settings, hex_name))
+
+    suffix = OD_SCORES_SUFFIX if conf.od_output == "scores" else "_train.arff"
 
-            queue.put([od_settings, train_file_path, file_save_path])
+    manifest = Manifest(conf.train_od_dir)
+    if not args["force"]:
+        manifest.load()
 
-    pool = [Process(target=od_worker, args=(queue,)) for _ in range(conf.n_jobs)]
+    skipped = 0
+    file_od_tasks = []
+    for train_file_path in train_data_loader.file_paths:
+        od_tasks = []
+        for od_settings, hex_name in od_methods:
+            file_save_path = od_file_path(
+                conf.train_od_dir, train_file_path, hex_name, suffix
+            )
+            job_hash = inputs_hash([train_file_path], hex_name)
+            if manifest.is_complete(file_save_path, job_hash):
+                skipped += 1
+            else:
+                od_tasks.append((od_settings, file_save_path, hex_name, job_hash))
+        file_od_tasks.append((train_file_path, od_tasks))
+
+    if skipped:
+        print("Skipping {} completed runs".format(skipped), flush=True)
+
+    scheduler = CostScheduler(conf.n_jobs, conf.runtime_history)
+    for train_file_path, od_tasks in file_od_tasks:
+        if conf.group_methods and od_tasks:
+            scheduler.add(
+                (train_file_path, od_tasks),
+                [hex_name for _, _, hex_name, _ in od_tasks],
+                train_file_path,
+            )
+        elif not conf.group_methods:
+            for od_task in od_tasks:
+                scheduler.add(
+                    (train_file_path, [od_task]), [od_task[2]], train_file_path
+                )
 
     try:
-        [process.start() for process in pool]
-        [process.join() for process in pool]
+        scheduler.run(
+            od_worker,
+            failed_od_results,
+            retries=conf.retries,
+            initializer=init_od_worker,
+            initargs=(conf,),
+            manifest=manifest,
+            skipped=skipped,
+        )
     except KeyboardInterrupt:
-        [process.terminate() for process in pool]
         print("\nInterupted!", flush=True, file=sys.stderr)
 
     print("Done")
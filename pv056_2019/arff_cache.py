@@ -0,0 +1,213 @@
+import json
+import os
+import shutil
+from collections import OrderedDict
+from hashlib import md5
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+HEADER_FILE_NAME = "header.json"
+CODES_DTYPE = "codes"
+
+
+def file_fingerprint(file_path: str) -> Dict[str, Any]:
+    stat = os.stat(file_path)
+    return {
+        "path": os.path.abspath(file_path),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+    }
+
+
+def read_columnar(
+    directory: str,
+) -> Tuple[pd.DataFrame, Dict[str, Any], Dict[str, Any]]:
+    """Loads a frame stored by ``write_columnar``.
+
+    Returns the frame, its ARFF header and the whole JSON sidecar.
+    """
+    with open(os.path.join(directory, HEADER_FILE_NAME)) as header_file:
+        header = json.load(header_file)
+
+    columns: Dict[str, Any] = {}
+    for index, column in enumerate(header["columns"]):
+        array = np.load(os.path.join(directory, "{}.npy".format(index)), mmap_mode="r")
+        if column["dtype"] == CODES_DTYPE:
+            levels = np.array(column["levels"] + [None], dtype=object)
+            array = levels[array]
+        columns[column["name"]] = array
+
+    names = [column["name"] for column in header["columns"]]
+    dataframe = pd.DataFrame(columns, columns=names)
+
+    arff_data = header["arff_data"]
+    arff_data["attributes"] = [
+        (name, values) for name, values in arff_data["attributes"]
+    ]
+
+    return dataframe, arff_data, header
+
+
+def write_columnar(
+    directory: str,
+    dataframe: pd.DataFrame,
+    arff_data: Dict[str, Any],
+    **extra_header: Any
+) -> bool:
+    """Stores a frame as one ``.npy`` file per column and a JSON sidecar.
+
+    Numeric columns are stored as they are, object columns (nominal and
+    string attributes) as ``int32`` codes into a list of levels kept in the
+    sidecar, ``-1`` meaning a missing value. The directory is replaced
+    atomically. Returns False when a column can not be stored.
+    """
+    columns: List[Dict[str, Any]] = []
+    arrays: List[np.ndarray] = []
+    for name in dataframe.columns:
+        values = dataframe[name].values
+        if values.dtype == object:
+            codes, levels = pd.factorize(values)
+            if not all(isinstance(level, str) for level in levels):
+                return False
+            columns.append({"name": name, "dtype": CODES_DTYPE, "levels": list(levels)})
+            arrays.append(codes.astype(np.int32))
+        else:
+            columns.append({"name": name, "dtype": values.dtype.str})
+            arrays.append(values)
+
+    header = {
+        **extra_header,
+        "arff_data": {
+            key: value for key, value in arff_data.items() if key.lower() != "data"
+        },
+        "columns": columns,
+    }
+
+    tmp_dir = "{}.tmp-{}".format(directory, os.getpid())
+    os.makedirs(tmp_dir, exist_ok=True)
+    try:
+        for index, array in enumerate(arrays):
+            np.save(os.path.join(tmp_dir, "{}.npy".format(index)), array)
+        with open(os.path.join(tmp_dir, HEADER_FILE_NAME), "w") as header_file:
+            json.dump(header, header_file)
+
+        shutil.rmtree(directory, ignore_errors=True)
+        os.rename(tmp_dir, directory)
+    except OSError:
+        # Another worker has stored the same frame in the meantime
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return True
+
+
+class ArffCache:
+    """Columnar on-disk cache of parsed ARFF files.
+
+    Every cached file has its own directory written by ``write_columnar``,
+    the JSON sidecar also holds the path, mtime and size of the source file.
+    Columns are loaded memory-mapped.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_dir(self, file_path: str) -> str:
+        key = md5(os.path.abspath(file_path).encode("UTF-8")).hexdigest()
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, file_path: str) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        entry_dir = self._entry_dir(file_path)
+        try:
+            with open(os.path.join(entry_dir, HEADER_FILE_NAME)) as header_file:
+                fingerprint = json.load(header_file)["fingerprint"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+        if fingerprint != file_fingerprint(file_path):
+            return None
+
+        dataframe, arff_data, _ = read_columnar(entry_dir)
+        return dataframe, arff_data
+
+    def store(self, file_path: str, dataframe: pd.DataFrame, arff_data: Dict[str, Any]):
+        write_columnar(
+            self._entry_dir(file_path),
+            dataframe,
+            arff_data,
+            fingerprint=file_fingerprint(file_path),
+        )
+
+
+def fingerprint_hash(file_path: str) -> str:
+    fingerprint = json.dumps(file_fingerprint(file_path), sort_keys=True)
+    return md5(fingerprint.encode("UTF-8")).hexdigest()
+
+
+def binarized_key(fingerprint: str, attributes: List[Any]) -> str:
+    attributes_json = json.dumps([attr for attr, _ in attributes])
+    return md5((fingerprint + attributes_json).encode("UTF-8")).hexdigest()
+
+
+class BinarizedCache:
+    """Memo of one-hot encoded frames shared by all detectors of a process.
+
+    Frames are kept in memory for the last ``max_size`` keys and, when
+    ``directory`` is set, also stored there as ``<key>.npy`` with the column
+    labels in ``<key>.json``, so other workers and later runs can reuse them.
+    """
+
+    def __init__(self, max_size: int = 4):
+        self.max_size = max_size
+        self.directory: Optional[str] = None
+        self._frames: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+
+    def _remember(self, key: str, dataframe: pd.DataFrame):
+        self._frames[key] = dataframe
+        self._frames.move_to_end(key)
+        while len(self._frames) > self.max_size:
+            self._frames.popitem(last=False)
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        if key in self._frames:
+            self._frames.move_to_end(key)
+            return self._frames[key]
+
+        if self.directory is None:
+            return None
+
+        path = os.path.join(self.directory, key)
+        try:
+            with open(path + ".json") as labels_file:
+                labels = json.load(labels_file)
+            values = np.load(path + ".npy")
+        except (OSError, ValueError):
+            return None
+
+        columns_index = pd.MultiIndex.from_tuples(
+            [tuple(label) for label in labels], names=["0", "1"]
+        )
+        dataframe = pd.DataFrame(values, columns=columns_index)
+        self._remember(key, dataframe)
+        return dataframe
+
+    def put(self, key: str, dataframe: pd.DataFrame):
+        self._remember(key, dataframe)
+
+        if self.directory is None or dataframe.empty:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, key)
+        tmp_path = "{}.tmp-{}".format(path, os.getpid())
+        with open(tmp_path + ".npy", "wb") as values_file:
+            np.save(values_file, dataframe.values)
+        with open(tmp_path + ".json", "w") as labels_file:
+            json.dump(list(dataframe.columns), labels_file)
+        os.replace(tmp_path + ".npy", path + ".npy")
+        os.replace(tmp_path + ".json", path + ".json")
+
+
+BINARIZED_CACHE = BinarizedCache()
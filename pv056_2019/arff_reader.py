@@ -0,0 +1,199 @@
+import io
+from typing import Any, Dict, List, Optional
+
+import arff
+import numpy as np
+import pandas as pd
+
+ARFF_READERS = ("liac-arff", "native")
+NUMERIC_TYPES = {"NUMERIC", "REAL", "INTEGER"}
+MISSING_VALUES = ["?", ""]
+
+
+def _split_header(content: str):
+    position = 0
+    for line in io.StringIO(content):
+        position += len(line)
+        if line.strip().lower().startswith("@data"):
+            return content[:position], content[position:]
+    raise arff.BadLayout("@DATA section not found")
+
+
+def _is_sparse(data: str) -> bool:
+    for line in io.StringIO(data):
+        line = line.strip()
+        if line and not line.startswith("%"):
+            return line.startswith("{")
+    return False
+
+
+def _nominal_column(values: pd.Series, categories: List[str]) -> np.ndarray:
+    codes = pd.Categorical(values, categories=categories).codes
+    invalid = (codes == -1) & values.notnull().values
+    if invalid.any():
+        raise arff.BadNominalValue(values[invalid].iloc[0])
+    return np.array(categories + [None], dtype=object)[codes]
+
+
+def _string_column(values: pd.Series) -> np.ndarray:
+    codes, uniques = pd.factorize(values)
+    return np.array(list(uniques) + [None], dtype=object)[codes]
+
+
+def _numeric_column(values: np.ndarray, attr_type: str) -> np.ndarray:
+    if attr_type == "INTEGER":
+        values = np.trunc(values)
+        if not np.isnan(values).any():
+            return values.astype(np.int64)
+    return values
+
+
+def _typed_column(values: pd.Series, attr_type: Any) -> np.ndarray:
+    if isinstance(attr_type, list):
+        return _nominal_column(values, attr_type)
+    elif attr_type == "STRING":
+        return _string_column(values)
+    return _numeric_column(values.values, attr_type)
+
+
+def _read_dense(data: str, attributes: List[Any]) -> pd.DataFrame:
+    dtypes = {
+        index: (
+            np.float64
+            if not isinstance(attr_type, list) and attr_type in NUMERIC_TYPES
+            else object
+        )
+        for index, (_, attr_type) in enumerate(attributes)
+    }
+    frame = pd.read_csv(
+        io.StringIO(data),
+        header=None,
+        names=list(range(len(attributes))),
+        dtype=dtypes,
+        quotechar="'",
+        skipinitialspace=True,
+        comment="%",
+        na_values=MISSING_VALUES,
+        keep_default_na=False,
+        float_precision="round_trip",
+    )
+    if frame.shape[1] != len(attributes):
+        raise arff.BadDataFormat(data[:100])
+
+    strip = " " in data or "\t" in data
+    columns: Dict[str, np.ndarray] = {}
+    for index, (name, attr_type) in enumerate(attributes):
+        values = frame[index]
+        if strip and values.dtype == object:
+            values = values.str.strip()
+        columns[name] = _typed_column(values, attr_type)
+
+    return pd.DataFrame(columns, columns=[name for name, _ in attributes])
+
+
+def _read_sparse(data: str, attributes: List[Any]) -> pd.DataFrame:
+    # Values which are not listed in a sparse row are 0, for nominal
+    # attributes this is their first value (same as in liac-arff)
+    rows: List[int] = []
+    cols: List[int] = []
+    values: List[Any] = []
+    n_rows = 0
+    for line in io.StringIO(data):
+        line = line.strip()
+        if not line or line.startswith("%"):
+            continue
+        parsed = arff._parse_values(line)
+        if not isinstance(parsed, dict):
+            raise arff.BadLayout("Mixed dense and sparse rows")
+        for col, value in parsed.items():
+            if col >= len(attributes):
+                raise arff.BadDataFormat(line)
+            rows.append(n_rows)
+            cols.append(col)
+            values.append(value)
+        n_rows += 1
+
+    row_index = np.array(rows, dtype=np.int64)
+    col_index = np.array(cols, dtype=np.int64)
+    raw_values = np.array(values, dtype=object)
+
+    columns: Dict[str, np.ndarray] = {}
+    for index, (name, attr_type) in enumerate(attributes):
+        mask = col_index == index
+        if isinstance(attr_type, list) or attr_type == "STRING":
+            default = attr_type[0] if isinstance(attr_type, list) else "0"
+            column = pd.Series([default] * n_rows, dtype=object)
+            column.iloc[row_index[mask]] = raw_values[mask]
+            columns[name] = _typed_column(column, attr_type)
+        else:
+            numeric = np.zeros(n_rows)
+            numeric[row_index[mask]] = [
+                np.nan if value is None else float(value) for value in raw_values[mask]
+            ]
+            columns[name] = _numeric_column(numeric, attr_type)
+
+    return pd.DataFrame(columns, columns=[name for name, _ in attributes])
+
+
+def load_arff(file_path: str) -> Dict[str, Any]:
+    """Loads an ARFF file into the same structure as ``arff.load``.
+
+    The header is decoded by liac-arff, the data section is parsed straight
+    into typed columns: float64 for NUMERIC/REAL (int64 for INTEGER without
+    missing values) and nominal values decoded from categorical codes over
+    the declared values. ``data`` is a DataFrame instead of a list of rows.
+    Files which need double quotes or escape sequences in the data section
+    are left to liac-arff.
+    """
+    with open(file_path) as arff_file:
+        content = arff_file.read()
+
+    header, data = _split_header(content)
+    if '"' in data or "\\" in data:
+        return arff.loads(content)
+
+    arff_data = arff.loads(header)
+    attributes = arff_data["attributes"]
+
+    if _is_sparse(data):
+        arff_data["data"] = _read_sparse(data, attributes)
+    else:
+        arff_data["data"] = _read_dense(data, attributes)
+
+    return arff_data
+
+
+def load_arff_classes(file_path: str) -> Optional[np.ndarray]:
+    """Values of the last attribute of an ARFF file, as loaded by ``load_arff``.
+
+    Only the last column of the data section is converted. Returns None for
+    files which need the full parser (sparse data, double quotes or escape
+    sequences).
+    """
+    with open(file_path) as arff_file:
+        content = arff_file.read()
+
+    header, data = _split_header(content)
+    if '"' in data or "\\" in data or _is_sparse(data):
+        return None
+
+    attributes = arff.loads(header)["attributes"]
+    frame = pd.read_csv(
+        io.StringIO(data),
+        header=None,
+        names=list(range(len(attributes))),
+        usecols=[len(attributes) - 1],
+        dtype=object,
+        quotechar="'",
+        skipinitialspace=True,
+        comment="%",
+        na_values=MISSING_VALUES,
+        keep_default_na=False,
+    )
+    values = frame[len(attributes) - 1]
+    if " " in data or "\t" in data:
+        values = values.str.strip()
+    attr_type = attributes[-1][1]
+    if not isinstance(attr_type, list) and attr_type in NUMERIC_TYPES:
+        return _numeric_column(values.astype(np.float64).values, attr_type)
+    return _typed_column(values, attr_type)
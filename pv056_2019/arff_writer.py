@@ -0,0 +1,84 @@
+from typing import Any, Dict, IO, List
+
+import arff
+import numpy as np
+import pandas as pd
+
+CHUNK_SIZE = 10000
+MISSING_VALUE = "?"
+
+
+def _encode_object_column(values: np.ndarray) -> List[str]:
+    codes, uniques = pd.factorize(values)
+    encoded = [
+        arff.encode_string(str(value)) if value != "" else MISSING_VALUE
+        for value in uniques
+    ]
+    return np.array(encoded + [MISSING_VALUE], dtype=object)[codes].tolist()
+
+
+def _encode_column(values: np.ndarray) -> List[str]:
+    if values.dtype.kind == "f":
+        encoded = list(map(repr, values.tolist()))
+        for index in np.flatnonzero(np.isnan(values)):
+            encoded[index] = MISSING_VALUE
+        return encoded
+    elif values.dtype.kind in {"i", "u"}:
+        return list(map(str, values.tolist()))
+    else:
+        return _encode_object_column(values.astype(object))
+
+
+def _encode_lines(dataframe: pd.DataFrame) -> List[str]:
+    columns = [_encode_column(column.values) for _, column in dataframe.items()]
+    return [",".join(row) + "\n" for row in zip(*columns)]
+
+
+def iter_encode_data(dataframe: pd.DataFrame, chunk_size: int = CHUNK_SIZE):
+    """Yields the data section of an ARFF file in blocks of ``chunk_size`` lines.
+
+    Values are formatted column by column for the whole block, numeric columns
+    are converted to Python floats in one go and nominal/string values are
+    quoted only once per distinct value.
+    """
+    for start in range(0, dataframe.shape[0], chunk_size):
+        yield "".join(_encode_lines(dataframe.iloc[start : start + chunk_size]))
+
+
+def encode_rows(dataframe: pd.DataFrame, chunk_size: int = CHUNK_SIZE) -> np.ndarray:
+    """Data lines of all rows, so several row subsets of one frame can be
+    written by ``dump_arff_rows`` while formatting every value only once."""
+    lines: List[str] = []
+    for start in range(0, dataframe.shape[0], chunk_size):
+        lines += _encode_lines(dataframe.iloc[start : start + chunk_size])
+    return np.array(lines, dtype=object)
+
+
+def _write_header(arff_data: Dict[str, Any], output_file: IO[str]):
+    header = {key: value for key, value in arff_data.items() if key.lower() != "data"}
+    header_lines: List[str] = list(arff.ArffEncoder().iter_encode(header))
+
+    output_file.write("\n".join(header_lines))
+
+
+def dump_arff(
+    dataframe: pd.DataFrame,
+    arff_data: Dict[str, Any],
+    output_file: IO[str],
+    chunk_size: int = CHUNK_SIZE,
+):
+    _write_header(arff_data, output_file)
+    for block in iter_encode_data(dataframe, chunk_size):
+        output_file.write(block)
+
+
+def dump_arff_rows(
+    lines: np.ndarray,
+    arff_data: Dict[str, Any],
+    output_file: IO[str],
+    chunk_size: int = CHUNK_SIZE,
+):
+    """Writes an ARFF file from data lines made by ``encode_rows``."""
+    _write_header(arff_data, output_file)
+    for start in range(0, len(lines), chunk_size):
+        output_file.write("".join(lines[start : start + chunk_size]))
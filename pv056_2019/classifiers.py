@@ -1,14 +1,41 @@
 import json
 import os
 import hashlib
+import math
 import re
-from multiprocessing import Queue
+
+import numpy as np
+
 from pv056_2019.utils import ID_NAME, OD_VALUE_NAME
 
-from pv056_2019.schemas import ClassifierSchema
-from typing import List
+from pv056_2019.folds import is_fold_view
+from pv056_2019.predictions import PREDICTIONS_SUFFIX
+from pv056_2019.manifest import Manifest, inputs_hash
+from pv056_2019.scheduler import CostScheduler
+from pv056_2019.schemas import ClassifierSchema, HeapSchema
+from typing import Any, Dict, List, Optional, Tuple
 from itertools import product
 
+DEFAULT_HEAP_MB = 1024
+REMOVE_RANGE = "weka.filters.unsupervised.instance.RemoveRange"
+# Memory of a JVM on top of its heap (metaspace, threads, code cache)
+JVM_OVERHEAD_MB = 128
+
+
+def mask_ranges(mask: np.ndarray) -> str:
+    """Weka range (1-based, e.g. ``3-5,9``) of the rows outside the mask."""
+    removed = np.flatnonzero(~mask) + 1
+    if not len(removed):
+        return ""
+
+    breaks = np.flatnonzero(np.diff(removed) != 1)
+    starts = removed[np.concatenate(([0], breaks + 1))]
+    ends = removed[np.concatenate((breaks, [len(removed) - 1]))]
+    return ",".join(
+        str(start) if start == end else "{}-{}".format(start, end)
+        for start, end in zip(starts.tolist(), ends.tolist())
+    )
+
 
 class ClassifierManager:
 
@@ -21,8 +48,18 @@ class ClassifierManager:
     # -x 5 -S 1
     # -W weka.classifiers.trees.J48 -- -C 0.25 -M 2
 
-    def __init__(self, log_folder, weka_jar_path):
+    def __init__(
+        self,
+        log_folder,
+        weka_jar_path,
+        heap: Optional[HeapSchema] = None,
+        result_format: str = "csv",
+        distribution: bool = False,
+    ):
         self.log_folder = log_folder
+        self.heap = heap
+        self.result_format = result_format
+        self.distribution = distribution
         if not os.path.isdir(self.log_folder):
             os.makedirs(self.log_folder, exist_ok=True)
         self.weka_jar_path = weka_jar_path
@@ -53,16 +90,49 @@ class ClassifierManager:
         with open(config_file_path, "w") as f:
             f.write(config_data)
 
+    def heap_size_mb(self, classifier: ClassifierSchema, cells: int) -> int:
+        """JVM heap for a run on ``cells`` data cells (train and test rows
+        times attributes), rounded up to a power of two, so runs of similar
+        sizes share the same JVM options."""
+        if self.heap is None:
+            return DEFAULT_HEAP_MB
+
+        factor = self.heap.classifier_factors.get(
+            classifier.class_name,
+            self.heap.classifier_factors.get(classifier.name, 1.0),
+        )
+        heap_mb = factor * self.heap.mb_per_million_cells * cells / 1e6
+        if heap_mb > 1:
+            heap_mb = 2 ** math.ceil(math.log2(heap_mb))
+        return int(min(max(heap_mb, self.heap.min_mb), self.heap.max_mb))
+
+    @staticmethod
+    def runtime_key(classifier: ClassifierSchema) -> str:
+        classifier_json = json.dumps(classifier.dict(), sort_keys=True)
+        return classifier.name + "_" + hashlib.md5(classifier_json.encode()).hexdigest()
+
     def fill_queue_and_create_configs(
         self,
-        queue: Queue,
+        scheduler: CostScheduler,
         classifiers: List[ClassifierSchema],
         dataset_tuples: List[List[str]],
+        manifest: Optional[Manifest] = None,
+        group_jobs: bool = False,
     ):
+        """Adds a task for every classifier run to the scheduler.
+
+        With ``group_jobs``, runs of a classifier on the same test set with
+        the same JVM options (typically training sets with different
+        percentages of outliers removed) are one task, run in one JVM.
+        """
+        skipped = 0
+        groups: Dict[Any, Tuple[str, List[Tuple[List[str], str, str]], str, int]] = {}
         for dataset_tuple, classifier in product(dataset_tuples, classifiers):
-            train_path, test_path, conf_path = dataset_tuple
+            train_path, test_path, conf_path = dataset_tuple[:3]
+            # Optional mask of the train rows kept after removing outliers
+            mask_path = dataset_tuple[3] if len(dataset_tuple) > 3 else ""
 
-            if not os.path.exists(train_path):
+            if not os.path.exists(train_path) and not is_fold_view(train_path):
                 raise IOError("Input dataset '{0}' does not exist.".format(train_path))
 
             # Create log_file names
@@ -72,7 +142,9 @@ class ClassifierManager:
             basename = os.path.basename(train_path)
             dataset_name = basename.split("_")[:2]
 
-            removed_arr = self._regex_removed.findall(basename)
+            removed_arr = self._regex_removed.findall(
+                os.path.basename(mask_path) or basename
+            )
             if removed_arr:
                 removed_str = removed_arr[0]
             else:
@@ -98,13 +170,19 @@ class ClassifierManager:
             run_args += ["-T", test_path]  # input dataset
             run_args += [
                 "-classifications",
-                "weka.classifiers.evaluation.output.prediction.CSV -p first -file {0} -suppress".format(  # noqa
-                    predict_file_path
+                "weka.classifiers.evaluation.output.prediction.CSV -p first -file {0} -suppress{1}".format(  # noqa
+                    predict_file_path, " -distribution" if self.distribution else ""
                 ),
             ]
 
             # Add Weka filters
-            str_filters = '-F "weka.filters.unsupervised.attribute.RemoveByName -E ^{}$"'.format(  # noqa
+            str_filters = ""
+            if mask_path:
+                removed_range = mask_ranges(np.load(mask_path))
+                if removed_range:
+                    # Instance filters of FilteredClassifier apply to training data only
+                    str_filters += '-F "{} -R {}" '.format(REMOVE_RANGE, removed_range)
+            str_filters += '-F "weka.filters.unsupervised.attribute.RemoveByName -E ^{}$"'.format(  # noqa
                 ID_NAME
             ) + ' -F "weka.filters.unsupervised.attribute.RemoveByName -E ^{}$"'.format(
                 OD_VALUE_NAME
@@ -121,13 +199,48 @@ class ClassifierManager:
                 run_args += ["--"]
                 run_args += classifier.args
 
+            heap_mb = self.heap_size_mb(
+                classifier,
+                scheduler.dataset_cells(train_path)
+                + scheduler.dataset_cells(test_path),
+            )
             run_args = [
                 "java",
-                "-Xmx1024m",
+                "-Xmx{}m".format(heap_mb),
                 "-cp",
                 self.weka_jar_path,
                 "weka.classifiers.meta.FilteredClassifier",
             ] + run_args
 
-            queue.put(run_args)
             self._save_model_config(config_file_path, final_config_str)
+
+            # Weka writes the CSV, the worker condenses it into the record
+            output_path = (
+                predict_file_path[: -len(".csv")] + PREDICTIONS_SUFFIX
+                if self.result_format == "npz"
+                else predict_file_path
+            )
+
+            job_hash = inputs_hash(
+                [train_path, test_path],
+                hashlib.md5(json.dumps(run_args).encode()).hexdigest(),
+            )
+            if manifest is not None and manifest.is_complete(output_path, job_hash):
+                skipped += 1
+                continue
+
+            runtime_key = self.runtime_key(classifier)
+            group_key = (test_path, runtime_key, heap_mb) if group_jobs else len(groups)
+            if group_key not in groups:
+                groups[group_key] = (runtime_key, [], train_path, heap_mb)
+            groups[group_key][1].append((run_args, output_path, job_hash))
+
+        for runtime_key, jobs, train_path, heap_mb in groups.values():
+            scheduler.add(
+                (runtime_key, jobs),
+                [runtime_key] * len(jobs),
+                train_path,
+                memory_mb=heap_mb + JVM_OVERHEAD_MB,
+            )
+
+        return skipped
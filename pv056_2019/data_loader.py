@@ -1,16 +1,25 @@
 from __future__ import absolute_import
 
+import io
 import os
 import warnings
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import arff
 import numpy as np
 import pandas as pd
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import OneHotEncoder
 
+from pv056_2019.arff_cache import BINARIZED_CACHE, ArffCache, binarized_key
+from pv056_2019.arff_reader import load_arff
+from pv056_2019.arff_writer import dump_arff
+from pv056_2019.folds import (
+    data_size,
+    fold_views,
+    is_fold_view,
+    load_fold,
+    path_fingerprint,
+)
 from pv056_2019.outlier_detection import DETECTORS
 from pv056_2019.utils import ID_NAME, OD_VALUE_NAME
 from pv056_2019.schemas import OutlierDetectorSchema
@@ -19,6 +28,8 @@ warnings.simplefilter(action="ignore", category=UserWarning)
 
 
 class DataFrameArff(pd.DataFrame):
+    _fingerprint: Optional[str] = None
+
     def __init__(self, *args, **kwargs):
         arff_data: Optional[dict] = kwargs.pop("arff_data", None)
         if arff_data is None:
@@ -40,61 +51,76 @@ class DataFrameArff(pd.DataFrame):
         return data
 
     def arff_dumps(self):
-        return arff.dumps(self.arff_data())
+        output = io.StringIO()
+        dump_arff(self, self._arff_data, output)
+        return output.getvalue()
 
     def arff_dump(self, file_path: str):
         with open(file_path, "w") as output_file:
-            data = self._arff_data
-            data.update({"data": self.replace(np.nan, None).values.tolist()})
-            arff.dump(data, output_file)
+            dump_arff(self, self._arff_data, output_file)
 
     def _binarize_categorical_values(self) -> pd.DataFrame:
-        encoded_dataframe = pd.DataFrame()
-        for attr, values in self._arff_data["attributes"][:-1]:
-            enc = OneHotEncoder(handle_unknown="ignore")
-            enc.fit(np.array(values).reshape(-1, 1))
+        attributes = self._arff_data["attributes"][:-1]
+        if self._fingerprint is None:
+            return self._encode_attributes(attributes)
+
+        key = binarized_key(self._fingerprint, attributes)
+        encoded_dataframe = BINARIZED_CACHE.get(key)
+        if encoded_dataframe is None:
+            encoded_dataframe = self._encode_attributes(attributes)
+            BINARIZED_CACHE.put(key, encoded_dataframe)
+
+        return encoded_dataframe.copy()
+
+    def _encode_attributes(self, attributes: List[Any]) -> pd.DataFrame:
+        if not attributes:
+            return pd.DataFrame()
+
+        encoders: List[Tuple[np.ndarray, List[Any]]] = []
+        labels: List[Tuple[str, Any]] = []
+        for attr, values in attributes:
+            column = self[attr].values
             if isinstance(values, list):
-                transformed_data = enc.transform(
-                    self[attr].values.reshape(-1, 1)
-                ).toarray()
-                columns_index = pd.MultiIndex.from_product(
-                    [[attr], values], names=["0", "1"]
-                )
+                # Same column order as the fitted OneHotEncoder (sorted values),
+                # unknown and missing values are all zeros
+                categories = sorted(values)
+                codes = pd.Categorical(column, categories=categories).codes
+                encoders.append((codes, categories))
+                labels += [(attr, value) for value in categories]
             elif values.lower() in {"numeric", "real", "integer"}:
-                imputer = SimpleImputer(
-                    missing_values=np.nan, strategy="mean"
-                )  # XXX settings
-
-                real_values = self[attr].values.astype(float)
-
-                if not np.isnan(real_values).all():
-                    transformed_data = imputer.fit_transform(
-                        real_values.reshape(-1, 1)
-                    ).reshape(-1, 1)
-                else:
-                    transformed_data = np.zeros(real_values.reshape(-1, 1).shape)
-                columns_index = pd.MultiIndex.from_product(
-                    [[attr], [values]], names=["0", "1"]
-                )
+                real_values = column.astype(float)
+                missing = np.isnan(real_values)
+                if missing.all():
+                    real_values = np.zeros(real_values.shape)
+                elif missing.any():
+                    real_values = np.where(
+                        missing, np.nanmean(real_values), real_values
+                    )
+                encoders.append((real_values, [values]))
+                labels.append((attr, values))
             elif values.lower() == "string":
-                imputer = SimpleImputer(missing_values=None, strategy="most_frequent")
-                imp_data = imputer.fit_transform(
-                    self[attr].values.reshape(-1, 1)
-                ).reshape(-1, 1)
-                transformed_data = enc.transform(imp_data).toarray()
-                columns_index = pd.MultiIndex.from_product(
-                    [[attr], range(transformed_data.shape[1])], names=["0", "1"]
-                )
+                # Encoder fitted on the attribute type itself, as before,
+                # gives a single indicator column
+                imputed = pd.Series(column, dtype=object)
+                if imputed.notnull().any():
+                    imputed = imputed.fillna(imputed.mode().iloc[0])
+                encoders.append(((imputed.values == values).astype(float), [0]))
+                labels.append((attr, 0))
             else:
                 raise ValueError(attr, values)
 
-            new = pd.DataFrame(transformed_data, columns=columns_index)
-            if encoded_dataframe.empty:
-                encoded_dataframe = new
+        encoded = np.zeros((self.shape[0], len(labels)))
+        offset = 0
+        for (data, categories), (_, values) in zip(encoders, attributes):
+            if isinstance(values, list):
+                rows = np.flatnonzero(data >= 0)
+                encoded[rows, offset + data[rows]] = 1.0
             else:
-                encoded_dataframe = encoded_dataframe.join(new)
+                encoded[:, offset] = data
+            offset += len(categories)
 
-        return encoded_dataframe
+        columns_index = pd.MultiIndex.from_tuples(labels, names=["0", "1"])
+        return pd.DataFrame(encoded, columns=columns_index)
 
     def add_index_column(self):
         if ID_NAME not in self.columns:
@@ -102,53 +128,86 @@ class DataFrameArff(pd.DataFrame):
             self._arff_data["attributes"].insert(0, (ID_NAME, "NUMERIC"))
         return self
 
-    def apply_outlier_detector(self, detector_schema: OutlierDetectorSchema):
+    def compute_outlier_scores(self, detector_schema: OutlierDetectorSchema):
         detector = DETECTORS[detector_schema.name](**detector_schema.parameters)
 
-        dataframe_without_id = DataFrameArff(
-            self.loc[:, self.columns != ID_NAME].values,
-            columns=self.columns[self.columns != ID_NAME],
-        )
+        dataframe_without_id = DataFrameArff(self.loc[:, self.columns != ID_NAME])
         dataframe_without_id._arff_data = {
             **self._arff_data,
             "attributes": [x for x in self._arff_data["attributes"] if x[0] != ID_NAME],
         }
+        dataframe_without_id._fingerprint = self._fingerprint
 
         detector.compute_scores(dataframe_without_id, self[self.columns[-1]])
 
-        new_frame = DataFrameArff(self.values, columns=self.columns)
-        new_frame._arff_data = self._arff_data
+        return detector
+
+    def with_od_values(self, values: np.array, data_type: str = "REAL"):
+        new_frame = DataFrameArff(self.copy())
+        new_frame._arff_data = {
+            **self._arff_data,
+            "attributes": list(self._arff_data["attributes"]),
+        }
 
-        new_frame.insert(
-            loc=len(self.columns) - 1, column=OD_VALUE_NAME, value=detector.values
-        )
-        new_frame._arff_data["attributes"].insert(
-            -1, (OD_VALUE_NAME, detector.data_type)
-        )
+        new_frame.insert(loc=len(self.columns) - 1, column=OD_VALUE_NAME, value=values)
+        new_frame._arff_data["attributes"].insert(-1, (OD_VALUE_NAME, data_type))
 
         return new_frame
 
+    def apply_outlier_detector(self, detector_schema: OutlierDetectorSchema):
+        detector = self.compute_outlier_scores(detector_schema)
+        return self.with_od_values(detector.values, detector.data_type)
+
     def select_by_index(self, index: np.array):
-        dataframe = self.iloc[index]
-        arff_dataframe = DataFrameArff(dataframe.values, columns=self.columns)
+        dataframe = self.iloc[index].reset_index(drop=True)
+        arff_dataframe = DataFrameArff(dataframe)
         arff_dataframe._arff_data = self._arff_data
 
         return arff_dataframe
 
+    def od_quantile_masks(self, quantiles: List[float]) -> List[np.ndarray]:
+        """Row masks of ``select_by_od_quantile`` for several quantiles.
+
+        OD values are sorted once, every threshold is found by a binary search
+        in the sorted values and the rows under it are those with a lower rank.
+        """
+        values = self[OD_VALUE_NAME].values.astype(float)
+        order = np.argsort(values, kind="stable")
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(len(order))
+
+        sorted_values = values[order]
+        # Missing values are sorted last and are never selected
+        sorted_values = sorted_values[: np.count_nonzero(~np.isnan(values))]
+        if not len(sorted_values):
+            return [np.zeros(len(values), dtype=bool) for _ in quantiles]
+
+        thresholds = np.quantile(sorted_values, quantiles)
+        counts = np.searchsorted(sorted_values, thresholds, side="right")
+        return [ranks < count for count in counts]
+
     def select_by_od_quantile(self, quantile):
         value = self[OD_VALUE_NAME].quantile(q=quantile)
 
-        dataframe = self[self[OD_VALUE_NAME] <= value]
+        dataframe = self[self[OD_VALUE_NAME] <= value].reset_index(drop=True)
 
-        arff_dataframe = DataFrameArff(dataframe.values, columns=self.columns)
+        arff_dataframe = DataFrameArff(dataframe)
         arff_dataframe._arff_data = self._arff_data
 
         return arff_dataframe
 
 
 class DataLoader:
-    def __init__(self, data_path: str, regex: str = r".*"):
+    def __init__(
+        self,
+        data_path: str,
+        regex: str = r".*",
+        cache_dir: Optional[str] = None,
+        reader: str = "liac-arff",
+    ):
         self._reg = re.compile(regex)
+        self.cache_dir = cache_dir
+        self.reader = reader
         self.file_paths: List[str] = []
         if os.path.isdir(data_path):
             files = (
@@ -158,24 +217,52 @@ class DataLoader:
             )
             for file_name in files:
                 self.file_paths.append(os.path.join(data_path, file_name))
+            for file_path in fold_views(data_path):
+                if file_path not in self.file_paths and self._reg.match(
+                    os.path.basename(file_path)
+                ):
+                    self.file_paths.append(file_path)
         elif (
-            os.path.isfile(data_path)
+            (os.path.isfile(data_path) or is_fold_view(data_path))
             and data_path.endswith(".arff")
             and self._reg.match(data_path)
         ):
             self.file_paths.append(data_path)
 
-        self.file_paths = sorted(self.file_paths, key=lambda x: os.path.getsize(x))
+        self.file_paths = sorted(self.file_paths, key=data_size)
 
     @staticmethod
     def _load_data_file(file_path: str):
         raise NotImplementedError()
 
     @staticmethod
-    def _load_arff_file(file_path: str) -> DataFrameArff:
-        with open(file_path) as arff_file:
-            data = arff.load(arff_file)
-            return DataFrameArff(arff_data=data)
+    def _load_arff_file(
+        file_path: str, cache_dir: Optional[str] = None, reader: str = "liac-arff"
+    ) -> DataFrameArff:
+        # Fold views are already stored in columns
+        fold_view = is_fold_view(file_path)
+        cache = ArffCache(cache_dir) if cache_dir and not fold_view else None
+        cached = cache.load(file_path) if cache is not None else None
+        if fold_view:
+            dataframe, arff_data = load_fold(file_path)
+            arff_dataframe = DataFrameArff(dataframe)
+            arff_dataframe._arff_data = arff_data
+        elif cached is not None:
+            dataframe, arff_data = cached
+            arff_dataframe = DataFrameArff(dataframe)
+            arff_dataframe._arff_data = arff_data
+        elif reader == "native":
+            arff_dataframe = DataFrameArff(arff_data=load_arff(file_path))
+        else:
+            with open(file_path) as arff_file:
+                data = arff.load(arff_file)
+                arff_dataframe = DataFrameArff(arff_data=data)
+
+        if cache is not None and cached is None:
+            cache.store(file_path, arff_dataframe, arff_dataframe._arff_data)
+
+        arff_dataframe._fingerprint = path_fingerprint(file_path)
+        return arff_dataframe
 
     def load_files(self):
         if not self.file_paths:
@@ -183,4 +270,4 @@ class DataLoader:
                 "No .arff detected. Please specify a correct path and unzip data file."
             )
         for file_path in self.file_paths:
-            yield self._load_arff_file(file_path)
+            yield self._load_arff_file(file_path, self.cache_dir, self.reader)
@@ -3,13 +3,123 @@ import csv
 import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
 
-from sklearn.model_selection import KFold
+import numpy as np
+from sklearn.model_selection import RepeatedKFold, RepeatedStratifiedKFold
 
+from pv056_2019.arff_reader import load_arff_classes
 from pv056_2019.data_loader import DataLoader
+from pv056_2019.folds import remove_folds, save_dataset, save_folds
+from pv056_2019.scheduler import arff_shape
 from pv056_2019.schemas import SplitterSchema
 
 
+def fold_name(conf: SplitterSchema, index: int) -> str:
+    """Fold part of split file names, ``<repeat>-<fold>`` for repeated CV."""
+    if conf.repeats == 1:
+        return str(index)
+    return "{}-{}".format(*divmod(index, conf.n_splits))
+
+
+def cross_validation_folds(
+    conf: SplitterSchema, rows: int, classes: Optional[np.ndarray] = None
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Train and test row indexes of all folds of all repeats."""
+    if conf.strategy == "stratified":
+        splitter = RepeatedStratifiedKFold(
+            n_splits=conf.n_splits, n_repeats=conf.repeats, random_state=conf.seed
+        )
+        # Missing values are a class of their own
+        classes = np.asarray(classes).astype(str)
+    else:
+        splitter = RepeatedKFold(
+            n_splits=conf.n_splits, n_repeats=conf.repeats, random_state=conf.seed
+        )
+        classes = None
+
+    return list(splitter.split(np.zeros((rows, 1)), classes))
+
+
+def dataset_folds(
+    conf: SplitterSchema, file_path: str
+) -> Tuple[int, List[Tuple[np.ndarray, np.ndarray]]]:
+    """Number of rows and folds of a dataset, computed without parsing all of
+    its values (the stratified strategy reads only the class, i.e. the last
+    attribute)."""
+    if conf.strategy != "stratified":
+        rows, _ = arff_shape(file_path)
+        return rows, cross_validation_folds(conf, rows)
+
+    classes = load_arff_classes(file_path)
+    if classes is None:
+        dataframe = DataLoader._load_arff_file(
+            file_path, conf.arff_cache_dir, conf.arff_reader
+        )
+        classes = dataframe[dataframe.columns[-1]].values
+    return len(classes), cross_validation_folds(conf, len(classes), classes)
+
+
+def split_dataset(
+    conf: SplitterSchema,
+    file_path: str,
+    folds: List[Tuple[str, np.ndarray, np.ndarray]],
+    rows: int,
+) -> List[List[str]]:
+    dataframe = DataLoader._load_arff_file(
+        file_path, conf.arff_cache_dir, conf.arff_reader
+    )
+    if len(dataframe) != rows:
+        raise ValueError(
+            "{} has {} rows, expected {}".format(file_path, len(dataframe), rows)
+        )
+
+    relation = dataframe._arff_data["relation"]
+    print("Splitting:", relation, [name for name, _, _ in folds], flush=True)
+    dataframe = dataframe.add_index_column()
+
+    if conf.split_output == "indices":
+        data_dir = save_dataset(conf.train_split_dir, relation, dataframe)
+        train_paths = save_folds(
+            conf.train_split_dir,
+            relation,
+            "train",
+            data_dir,
+            {name: train_index for name, train_index, _ in folds},
+        )
+        test_paths = save_folds(
+            conf.test_split_dir,
+            relation,
+            "test",
+            data_dir,
+            {name: test_index for name, _, test_index in folds},
+        )
+        return [
+            [train_path, test_path, ""]
+            for train_path, test_path in zip(train_paths, test_paths)
+        ]
+
+    remove_folds(conf.train_split_dir, relation)
+    remove_folds(conf.test_split_dir, relation)
+
+    datasets_output = []
+    for name, train_index, test_index in folds:
+        train_frame = dataframe.select_by_index(train_index)
+        train_name = relation + "_" + name + "_train.arff"
+        train_split_output = os.path.join(conf.train_split_dir, train_name)
+        train_frame.arff_dump(train_split_output)
+
+        test_frame = dataframe.select_by_index(test_index)
+        test_name = relation + "_" + name + "_test.arff"
+        test_split_output = os.path.join(conf.test_split_dir, test_name)
+        test_frame.arff_dump(test_split_output)
+
+        datasets_output.append([train_split_output, test_split_output, ""])
+
+    return datasets_output
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Script splits datasets for cross-validation"
@@ -28,34 +138,47 @@ def main():
         conf = SplitterSchema(**json.load(json_file))
 
     data_loader = DataLoader(conf.data_path)
+    if not data_loader.file_paths:
+        raise RuntimeError(
+            "No .arff detected. Please specify a correct path and unzip data file."
+        )
+
+    # Folds of every dataset are computed once here, datasets with more
+    # folds than workers per dataset are split in several tasks (fold
+    # indexes of one dataset are stored together, so they are written by
+    # one task)
+    n_folds = conf.n_splits * conf.repeats
+    chunks = max(1, min(n_folds, conf.n_jobs // len(data_loader.file_paths)))
+    if conf.split_output == "indices":
+        chunks = 1
+    tasks = []
+    for file_path in data_loader.file_paths:
+        rows, all_folds = dataset_folds(conf, file_path)
+        folds = [
+            (fold_name(conf, index), train_index, test_index)
+            for index, (train_index, test_index) in enumerate(all_folds)
+        ]
+        for folds_chunk in np.array_split(np.arange(n_folds), chunks):
+            tasks.append((file_path, [folds[index] for index in folds_chunk], rows))
 
     datasets_output = []
+    executor = ProcessPoolExecutor(conf.n_jobs)
     try:
-        for dataframe in data_loader.load_files():
-            print("Splitting:", dataframe._arff_data["relation"], flush=True)
-            dataframe = dataframe.add_index_column()
-            kfold = KFold(n_splits=5, shuffle=True, random_state=42)
-            for index, data_fold in enumerate(kfold.split(dataframe.index.values)):
-                train_index, test_index = data_fold
-
-                train_frame = dataframe.select_by_index(train_index)
-                train_name = (
-                    dataframe._arff_data["relation"] + "_" + str(index) + "_train.arff"
-                )
-                train_split_output = os.path.join(conf.train_split_dir, train_name)
-                train_frame.arff_dump(train_split_output)
-
-                test_frame = dataframe.select_by_index(test_index)
-                test_name = (
-                    dataframe._arff_data["relation"] + "_" + str(index) + "_test.arff"
+        futures = [executor.submit(split_dataset, conf, *task) for task in tasks]
+        for task, future in zip(tasks, futures):
+            try:
+                datasets_output += future.result()
+            except Exception as exc:
+                print(
+                    "Error:\n\t{}\n\t".format(os.path.basename(task[0])),
+                    exc,
+                    file=sys.stderr,
+                    flush=True,
                 )
-                test_split_output = os.path.join(conf.test_split_dir, test_name)
-                test_frame.arff_dump(test_split_output)
-
-                datasets_output.append([train_split_output, test_split_output, ""])
-
     except KeyboardInterrupt:
         print("\nInterupted!", flush=True, file=sys.stderr)
+    finally:
+        executor.shutdown(wait=False)
 
     with open(args["datasets_file"], "w") as datasets_file:
         writer = csv.writer(datasets_file, delimiter=",")
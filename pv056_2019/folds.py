@@ -0,0 +1,162 @@
+import json
+import os
+from hashlib import md5
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pv056_2019.arff_cache import (
+    HEADER_FILE_NAME,
+    fingerprint_hash,
+    read_columnar,
+    write_columnar,
+)
+from pv056_2019.arff_writer import dump_arff
+
+FOLDS_SUFFIX = ".folds.npz"
+DATA_DIR_SUFFIX = ".data"
+FOLD_KINDS = ("train", "test")
+# Key of the path of the canonical copy in a folds file
+DATA_DIR_KEY = "data_dir"
+
+
+def folds_file_path(split_dir: str, relation: str, kind: str) -> str:
+    return os.path.join(split_dir, "{}_{}{}".format(relation, kind, FOLDS_SUFFIX))
+
+
+def fold_file_path(split_dir: str, relation: str, fold: str, kind: str) -> str:
+    return os.path.join(split_dir, "{}_{}_{}.arff".format(relation, fold, kind))
+
+
+def save_dataset(split_dir: str, relation: str, dataframe: pd.DataFrame) -> str:
+    """Stores the canonical copy of a dataset, returns its directory."""
+    data_dir = os.path.join(split_dir, relation + DATA_DIR_SUFFIX)
+    if not write_columnar(data_dir, dataframe, dataframe._arff_data):
+        raise ValueError("Dataset {} can not be stored in columns".format(relation))
+    return data_dir
+
+
+def save_folds(
+    split_dir: str, relation: str, kind: str, data_dir: str, folds: Dict[str, Any]
+) -> List[str]:
+    """Stores row indexes of the ``kind`` part of every fold of a dataset,
+    returns the paths of the fold views."""
+    file_path = folds_file_path(split_dir, relation, kind)
+    tmp_path = "{}.tmp-{}.npz".format(file_path, os.getpid())
+    np.savez_compressed(
+        tmp_path,
+        **{fold: np.asarray(index, dtype=np.int32) for fold, index in folds.items()},
+        **{DATA_DIR_KEY: np.array(os.path.relpath(data_dir, split_dir))}
+    )
+    os.replace(tmp_path, file_path)
+    return [fold_file_path(split_dir, relation, fold, kind) for fold in folds]
+
+
+def remove_folds(split_dir: str, relation: str):
+    """Removes folds files left by a previous split of a dataset."""
+    for kind in FOLD_KINDS:
+        file_path = folds_file_path(split_dir, relation, kind)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def _fold_source(file_path: str) -> Optional[Tuple[str, str]]:
+    """Folds file and fold of a fold view path, None for other paths."""
+    if not file_path.endswith(".arff"):
+        return None
+    name_split = os.path.basename(file_path)[: -len(".arff")].rsplit("_", 2)
+    if len(name_split) != 3 or name_split[2] not in FOLD_KINDS:
+        return None
+
+    relation, fold, kind = name_split
+    file_path = folds_file_path(os.path.dirname(file_path), relation, kind)
+    if not os.path.exists(file_path):
+        return None
+    return file_path, fold
+
+
+def is_fold_view(file_path: str) -> bool:
+    """Whether the path is a fold stored as row indexes.
+
+    The ARFF file of a fold view does not need to exist, when it does it is
+    only an export of the view for Weka.
+    """
+    return _fold_source(file_path) is not None
+
+
+def fold_views(split_dir: str) -> List[str]:
+    """Paths of all fold views stored in a directory."""
+    paths = []
+    for file_name in sorted(os.listdir(split_dir)):
+        for kind in FOLD_KINDS:
+            suffix = "_{}{}".format(kind, FOLDS_SUFFIX)
+            if file_name.endswith(suffix):
+                relation = file_name[: -len(suffix)]
+                with np.load(os.path.join(split_dir, file_name)) as folds:
+                    paths += [
+                        fold_file_path(split_dir, relation, fold, kind)
+                        for fold in folds.files
+                        if fold != DATA_DIR_KEY
+                    ]
+    return paths
+
+
+def _load_index(file_path: str) -> Tuple[np.ndarray, str]:
+    source = _fold_source(file_path)
+    if source is None:
+        raise ValueError("{} is not a fold view".format(file_path))
+    folds_path, fold = source
+    with np.load(folds_path) as folds:
+        data_dir = os.path.join(os.path.dirname(folds_path), str(folds[DATA_DIR_KEY]))
+        return folds[fold], data_dir
+
+
+def load_fold(file_path: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Materialises a fold view from the canonical copy of its dataset."""
+    index, data_dir = _load_index(file_path)
+    dataframe, arff_data, _ = read_columnar(data_dir)
+    return dataframe.iloc[index].reset_index(drop=True), arff_data
+
+
+def fold_shape(file_path: str) -> Tuple[int, int]:
+    """Number of rows and attributes of a fold view."""
+    index, data_dir = _load_index(file_path)
+    with open(os.path.join(data_dir, HEADER_FILE_NAME)) as header_file:
+        attributes = len(json.load(header_file)["columns"])
+    return len(index), attributes
+
+
+def data_size(file_path: str) -> int:
+    """Size of an ARFF file or the estimated size of a fold view in bytes."""
+    if not is_fold_view(file_path):
+        return os.path.getsize(file_path)
+    rows, attributes = fold_shape(file_path)
+    return rows * attributes * 8
+
+
+def path_fingerprint(file_path: str) -> str:
+    """Hash of the path, mtime and size of a file or of the folds file of a
+    fold view."""
+    source = _fold_source(file_path)
+    if source is None:
+        return fingerprint_hash(file_path)
+    folds_path, fold = source
+    return md5((fingerprint_hash(folds_path) + fold).encode("UTF-8")).hexdigest()
+
+
+def export_fold(file_path: str):
+    """Writes the ARFF file of a fold view, unless it is already up to date."""
+    source = _fold_source(file_path)
+    if source is None:
+        return
+    if os.path.exists(file_path) and os.path.getmtime(file_path) >= os.path.getmtime(
+        source[0]
+    ):
+        return
+
+    dataframe, arff_data = load_fold(file_path)
+    tmp_path = "{}.tmp-{}".format(file_path, os.getpid())
+    with open(tmp_path, "w") as output_file:
+        dump_arff(dataframe, arff_data, output_file)
+    os.replace(tmp_path, file_path)
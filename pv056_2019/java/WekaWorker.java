@@ -0,0 +1,105 @@
+import java.io.BufferedReader;
+import java.io.File;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+
+import weka.classifiers.evaluation.Evaluation;
+import weka.classifiers.evaluation.output.prediction.AbstractOutput;
+import weka.classifiers.meta.FilteredClassifier;
+import weka.core.Instances;
+import weka.core.Utils;
+import weka.core.converters.ConverterUtils.DataSource;
+
+/**
+ * Runs FilteredClassifier evaluations back-to-back in one long-lived JVM.
+ *
+ * Every line on stdin holds the tab separated options of one
+ * FilteredClassifier run (the same options as on its command line). For
+ * every line exactly one status line is written to stdout, either "OK" or
+ * "ERROR" followed by a tab and the error message. Everything Weka itself
+ * prints goes to stderr.
+ *
+ * The last test set is kept in memory, so consecutive runs with the same
+ * test file (e.g. training sets with different outliers removed) load it
+ * only once.
+ */
+public class WekaWorker {
+
+    private static String testPath;
+    private static long testModified;
+    private static Instances testData;
+
+    private static Instances loadTest(String path) throws Exception {
+        long modified = new File(path).lastModified();
+        if (!path.equals(testPath) || modified != testModified) {
+            testData = null;
+            testData = read(path);
+            testPath = path;
+            testModified = modified;
+        }
+        return testData;
+    }
+
+    private static Instances read(String path) throws Exception {
+        Instances data = DataSource.read(path);
+        data.setClassIndex(data.numAttributes() - 1);
+        return data;
+    }
+
+    private static void evaluate(String[] options) throws Exception {
+        String trainPath = Utils.getOption('t', options);
+        String testPath = Utils.getOption('T', options);
+        String[] outputSpec = Utils.splitOptions(Utils.getOption("classifications", options));
+        // Seed of cross-validation, train/test evaluation does not use it
+        Utils.getOption('S', options);
+
+        FilteredClassifier classifier = new FilteredClassifier();
+        classifier.setOptions(options);
+        Utils.checkForRemainingOptions(options);
+
+        Instances train = read(trainPath);
+        Instances test = loadTest(testPath);
+        if (!train.equalHeaders(test)) {
+            throw new IllegalArgumentException(
+                    "Train and test set are not compatible: " + train.equalHeadersMsg(test));
+        }
+        classifier.buildClassifier(train);
+
+        String outputClass = outputSpec[0];
+        outputSpec[0] = "";
+        AbstractOutput output = (AbstractOutput) Utils.forName(
+                AbstractOutput.class, outputClass, outputSpec);
+        output.setHeader(test);
+        output.setBuffer(new StringBuffer());
+
+        // The header is the first line of the prediction file, the file
+        // itself (-file) is written by printFooter
+        Evaluation evaluation = new Evaluation(train);
+        output.printHeader();
+        evaluation.evaluateModel(classifier, test, output);
+        output.printFooter();
+    }
+
+    public static void main(String[] argv) throws Exception {
+        PrintStream protocol = System.out;
+        System.setOut(System.err);
+
+        BufferedReader input = new BufferedReader(new InputStreamReader(System.in, "UTF-8"));
+        String line;
+        while ((line = input.readLine()) != null) {
+            if (line.isEmpty()) {
+                continue;
+            }
+
+            String[] options = line.split("\t", -1);
+            try {
+                evaluate(options);
+                protocol.println("OK");
+            } catch (Throwable exc) {
+                String message = exc.toString().replace('\n', ' ');
+                protocol.println("ERROR\t" + message);
+            }
+            protocol.flush();
+        }
+    }
+}
@@ -2,12 +2,29 @@ import argparse
 import csv
 import json
 import os
-import subprocess
 import sys
-from multiprocessing import Process, Queue
+import time
+from typing import List, Optional, Tuple
 
 from pv056_2019.classifiers import ClassifierManager
+from pv056_2019.folds import export_fold
+from pv056_2019.manifest import Manifest
+from pv056_2019.predictions import PREDICTIONS_SUFFIX, condense_predictions
+from pv056_2019.pool import (
+    STATUS_ERROR,
+    STATUS_OK,
+    STATUS_TIMEOUT,
+    JobResult,
+    run_process,
+)
+from pv056_2019.scheduler import CostScheduler
 from pv056_2019.schemas import RunClassifiersCongfigSchema
+from pv056_2019.weka_jvm import (
+    JobTimeout,
+    JVMError,
+    PersistentJVM,
+    compile_weka_worker,
+)
 
 
 def _valid_config_path(path):
@@ -19,11 +36,107 @@ def _valid_config_path(path):
         return path
 
 
-def weka_worker(queue):
-    while not queue.empty():
-        args = queue.get()
-        subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        print(";".join([args[16], args[6], args[8]]), flush=True)
+OUT_OF_MEMORY_ERROR = "java.lang.OutOfMemoryError"
+STATUS_OUT_OF_MEMORY = "out of memory"
+
+_CLASS_DIR: Optional[str] = None
+_JVM: Optional[PersistentJVM] = None
+_TIMEOUT: Optional[float] = None
+
+
+def init_weka_worker(
+    class_dir: Optional[str], persistent_jvm: bool, timeout: Optional[float]
+):
+    global _CLASS_DIR, _JVM, _TIMEOUT
+    _CLASS_DIR = class_dir
+    _JVM = PersistentJVM(class_dir) if class_dir and persistent_jvm else None
+    _TIMEOUT = timeout
+
+
+def run_weka(
+    args, jvm: Optional[PersistentJVM], timeout: Optional[float]
+) -> Tuple[str, Optional[int], str]:
+    if jvm is not None:
+        try:
+            jvm.run(args, timeout)
+            return STATUS_OK, None, ""
+        except JobTimeout:
+            return STATUS_TIMEOUT, None, ""
+        except RuntimeError as exc:
+            if OUT_OF_MEMORY_ERROR in str(exc):
+                return STATUS_OUT_OF_MEMORY, None, str(exc)
+            return STATUS_ERROR, None, str(exc)
+        except JVMError as exc:
+            print(
+                "Warning: persistent JVM failed, running in a new JVM:",
+                exc,
+                file=sys.stderr,
+                flush=True,
+            )
+
+    returncode, peak_rss, stderr_tail, timed_out = run_process(args, timeout)
+    if timed_out:
+        return STATUS_TIMEOUT, peak_rss, stderr_tail
+    elif OUT_OF_MEMORY_ERROR in stderr_tail:
+        return STATUS_OUT_OF_MEMORY, peak_rss, stderr_tail
+    elif returncode != 0:
+        return STATUS_ERROR, peak_rss, stderr_tail
+    return STATUS_OK, peak_rss, stderr_tail
+
+
+def weka_worker(task) -> List[JobResult]:
+    runtime_key, jobs = task
+
+    # Jobs of one task share a JVM, even without a persistent one
+    jvm = _JVM
+    if jvm is None and _CLASS_DIR and len(jobs) > 1:
+        jvm = PersistentJVM(_CLASS_DIR)
+
+    results = []
+    try:
+        for args, output_path, job_hash in jobs:
+            start_time = time.time()
+            try:
+                # Weka reads ARFF files only, fold views are written on demand
+                export_fold(args[6])
+                export_fold(args[8])
+            except Exception as exc:
+                status, peak_rss, stderr_tail = STATUS_ERROR, None, repr(exc)
+            else:
+                status, peak_rss, stderr_tail = run_weka(args, jvm, _TIMEOUT)
+            print(";".join([args[16], args[6], args[8]]), flush=True)
+            if status == STATUS_OK and output_path.endswith(PREDICTIONS_SUFFIX):
+                try:
+                    condense_predictions(
+                        output_path[: -len(PREDICTIONS_SUFFIX)] + ".csv", output_path
+                    )
+                except Exception as exc:
+                    status, stderr_tail = STATUS_ERROR, repr(exc)
+
+            results.append(
+                JobResult(
+                    runtime_key,
+                    output_path,
+                    job_hash,
+                    status,
+                    time.time() - start_time,
+                    peak_rss,
+                    stderr_tail,
+                )
+            )
+    finally:
+        if jvm is not None and jvm is not _JVM:
+            jvm.close()
+
+    return results
+
+
+def failed_weka_results(task, status: str, message: str) -> List[JobResult]:
+    runtime_key, jobs = task
+    return [
+        JobResult(runtime_key, output_path, job_hash, status, 0.0, None, message)
+        for _, output_path, job_hash in jobs
+    ]
 
 
 def main():
@@ -42,6 +155,11 @@ def main():
         help="Path to csv with data files",
         required=True,
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="run all jobs, even those completed by a previous run",
+    )
     args = parser.parse_args()
 
     with open(args.config_clf, "r") as config_file:
@@ -50,20 +168,45 @@ def main():
     datasets = []
     with open(args.datasets_csv, "r") as datasets_csv_file:
         reader = csv.reader(datasets_csv_file, delimiter=",")
-        datasets = sorted([row for row in reader], key=lambda x: os.path.getsize(x[0]))
+        datasets = [row for row in reader]
+
+    clf_man = ClassifierManager(
+        conf.output_folder,
+        conf.weka_jar_path,
+        conf.heap,
+        conf.result_format,
+        conf.prediction_distribution,
+    )
 
-    clf_man = ClassifierManager(conf.output_folder, conf.weka_jar_path)
+    manifest = Manifest(conf.output_folder)
+    if not args.force:
+        manifest.load()
 
-    queue = Queue()
-    clf_man.fill_queue_and_create_configs(queue, conf.classifiers, datasets)
+    scheduler = CostScheduler(conf.n_jobs, conf.runtime_history)
+    skipped = clf_man.fill_queue_and_create_configs(
+        scheduler, conf.classifiers, datasets, manifest, conf.group_jobs
+    )
+    if skipped:
+        print("Skipping {} completed runs".format(skipped), flush=True)
 
-    pool = [Process(target=weka_worker, args=(queue,)) for _ in range(conf.n_jobs)]
+    class_dir = (
+        compile_weka_worker(conf.weka_jar_path)
+        if conf.persistent_jvm or conf.group_jobs
+        else None
+    )
 
     try:
-        [process.start() for process in pool]
-        [process.join() for process in pool]
+        scheduler.run(
+            weka_worker,
+            failed_weka_results,
+            retries=conf.retries,
+            initializer=init_weka_worker,
+            initargs=(class_dir, conf.persistent_jvm, conf.timeout),
+            manifest=manifest,
+            memory_budget_mb=conf.memory_budget_mb,
+            skipped=skipped,
+        )
     except KeyboardInterrupt:
-        [process.terminate() for process in pool]
         print("\nInterupted!", flush=True, file=sys.stderr)
 
     print("Done")
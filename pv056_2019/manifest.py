@@ -0,0 +1,72 @@
+import json
+import os
+import time
+from hashlib import md5
+from typing import Any, Dict, List
+
+from pv056_2019.folds import path_fingerprint
+from pv056_2019.pool import STATUS_OK
+
+MANIFEST_FILE_NAME = "manifest.jsonl"
+
+
+def inputs_hash(input_paths: List[str], config_hash: str) -> str:
+    """Hash of a job's configuration and the path, mtime and size of its inputs."""
+    fingerprints = [config_hash] + [path_fingerprint(path) for path in input_paths]
+    return md5("\n".join(fingerprints).encode("UTF-8")).hexdigest()
+
+
+class Manifest:
+    """Append-only JSON lines log of finished jobs of one output directory.
+
+    Every line records the output path, the hash of the job's inputs and
+    configuration, the exit status and the duration of one job. A job is
+    complete when the last record of its output has the same inputs hash, a
+    successful status and the output file still exists. Lines are appended
+    with a single write, so several processes can record jobs concurrently.
+    """
+
+    def __init__(self, output_dir: str):
+        self.file_path = os.path.join(output_dir, MANIFEST_FILE_NAME)
+        self._records: Dict[str, Dict[str, Any]] = {}
+
+    def load(self):
+        self._records = {}
+        if not os.path.exists(self.file_path):
+            return
+
+        with open(self.file_path) as manifest_file:
+            for line in manifest_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Unfinished line of an interrupted run
+                    continue
+                self._records[record["output"]] = record
+
+    def is_complete(self, output_path: str, job_inputs_hash: str) -> bool:
+        record = self._records.get(os.path.abspath(output_path))
+        return (
+            record is not None
+            and record["inputs_hash"] == job_inputs_hash
+            and record["status"] == STATUS_OK
+            and os.path.exists(output_path)
+        )
+
+    def record(
+        self, output_path: str, job_inputs_hash: str, status: str, duration: float
+    ):
+        line = json.dumps(
+            {
+                "output": os.path.abspath(output_path),
+                "inputs_hash": job_inputs_hash,
+                "status": status,
+                "duration": duration,
+                "finished": time.time(),
+            }
+        )
+        fd = os.open(self.file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (line + "\n").encode("UTF-8"))
+        finally:
+            os.close(fd)
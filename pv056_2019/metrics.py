@@ -0,0 +1,168 @@
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from pv056_2019.predictions import MISSING_CLASS
+
+# Metrics of pv056-statistics and their column (prefix for per-class ones)
+METRICS = {
+    "accuracy": "Accuracy",
+    "balanced_accuracy": "Balanced accuracy",
+    "macro_f1": "Macro F1",
+    "auc": "AUC",
+    "recall": "Recall",
+    "confusion": "Confusion",
+}
+# Label of a missing prediction in confusion columns
+MISSING_LABEL = "?"
+
+
+def confusion_matrix(
+    actual: np.ndarray, predicted: np.ndarray, n_classes: int
+) -> np.ndarray:
+    """Counts of (actual, predicted) class pairs of one prediction file.
+
+    Rows are actual classes, columns predicted classes and the last column
+    counts missing predictions. Instances with a missing class are left out.
+    """
+    known = actual != MISSING_CLASS
+    actual = actual[known].astype(np.int64)
+    predicted = predicted[known].astype(np.int64)
+    predicted[predicted == MISSING_CLASS] = n_classes
+    counts = np.bincount(
+        actual * (n_classes + 1) + predicted, minlength=n_classes * (n_classes + 1)
+    )
+    return counts.reshape(n_classes, n_classes + 1)
+
+
+def _average_ranks(values: np.ndarray) -> np.ndarray:
+    """1-based ranks of values, equal values get the average of their ranks."""
+    order = np.argsort(values, kind="mergesort")
+    sorted_values = values[order]
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    ends = np.r_[starts[1:], len(values)]
+    run_lengths = ends - starts
+    ranks = np.empty(len(values))
+    ranks[order] = np.repeat((starts + ends + 1) / 2, run_lengths)
+    return ranks
+
+
+def class_auc(actual: np.ndarray, distribution: np.ndarray) -> np.ndarray:
+    """One-vs-rest area under the ROC curve of every class.
+
+    Computed from ranks of the predicted probabilities (Mann-Whitney U), ties
+    count one half. NaN for classes without positive or negative instances.
+    """
+    known = actual != MISSING_CLASS
+    actual = actual[known]
+    distribution = distribution[known]
+    ranks = np.column_stack([_average_ranks(column) for column in distribution.T])
+    positive = actual[:, np.newaxis] == np.arange(distribution.shape[1])
+    n_positive = positive.sum(axis=0)
+    n_negative = len(actual) - n_positive
+    with np.errstate(divide="ignore", invalid="ignore"):
+        auc = ((ranks * positive).sum(axis=0) - n_positive * (n_positive + 1) / 2) / (
+            n_positive * n_negative
+        )
+    auc[(n_positive == 0) | (n_negative == 0)] = np.nan
+    return auc
+
+
+def file_metrics(
+    confusion: pd.DataFrame, classes: pd.DataFrame, metrics: Sequence[str]
+) -> pd.DataFrame:
+    """Metrics of many prediction files at once, one row per file.
+
+    ``confusion`` holds the non-zero cells of confusion matrices (columns
+    file, actual, predicted, count, with -1 for a missing prediction) and
+    ``classes`` the classes of every file (file, class, label, auc). Accuracy
+    is not computed here, it is kept by the results index itself.
+    """
+    columns: List[pd.DataFrame] = []
+    labels = classes.set_index(["file", "class"])["label"]
+
+    cells = confusion.set_index(["file", "actual", "predicted"])["count"]
+    support = cells.groupby(level=["file", "actual"]).sum()
+    support.index.names = ["file", "class"]
+    predicted = cells.groupby(level=["file", "predicted"]).sum()
+    predicted.index.names = ["file", "class"]
+    diagonal = confusion[confusion["actual"] == confusion["predicted"]]
+    true_positive = diagonal.set_index(["file", "actual"])["count"]
+    true_positive.index.names = ["file", "class"]
+
+    per_class = pd.DataFrame(
+        {"support": support, "predicted": predicted, "tp": true_positive}
+    ).fillna(0)
+    per_class = per_class[per_class.index.get_level_values("class") != MISSING_CLASS]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Classes without instances have no recall, classes neither actual
+        # nor predicted have no F1, averages are taken over the others
+        recall = per_class["tp"] / per_class["support"].where(per_class["support"] > 0)
+        both = per_class["support"] + per_class["predicted"]
+        f1 = 2 * per_class["tp"] / both.where(both > 0)
+
+    if "balanced_accuracy" in metrics:
+        columns.append(
+            recall.groupby(level="file")
+            .mean()
+            .rename(METRICS["balanced_accuracy"])
+            .to_frame()
+        )
+    if "macro_f1" in metrics:
+        columns.append(
+            f1.groupby(level="file").mean().rename(METRICS["macro_f1"]).to_frame()
+        )
+    if "auc" in metrics:
+        columns.append(
+            classes.groupby("file")["auc"].mean().rename(METRICS["auc"]).to_frame()
+        )
+    if "recall" in metrics:
+        columns.append(
+            _class_columns(recall.dropna(), labels, METRICS["recall"] + " {}")
+        )
+    if "confusion" in metrics:
+        columns.append(_confusion_columns(confusion, labels))
+
+    if not columns:
+        return pd.DataFrame(index=pd.Index([], name="file"))
+    return pd.concat(columns, axis=1)
+
+
+def _class_columns(values: pd.Series, labels: pd.Series, name: str) -> pd.DataFrame:
+    """Pivots per-class values of files to one column per class label."""
+    frame = values.rename("value").to_frame().join(labels)
+    wide = frame.pivot_table(index="file", columns="label", values="value")
+    return wide.rename(columns=name.format)
+
+
+def _confusion_columns(confusion: pd.DataFrame, labels: pd.Series) -> pd.DataFrame:
+    """Pivots confusion cells to one column per (actual, predicted) label pair.
+
+    A pair of classes of a file which was never counted is zero, pairs with
+    classes the file does not have (e.g. of other datasets) are NaN.
+    """
+    frame = confusion.join(labels.rename("actual_label"), on=["file", "actual"])
+    frame = frame.join(labels.rename("predicted_label"), on=["file", "predicted"])
+    frame["predicted_label"] = frame["predicted_label"].fillna(MISSING_LABEL)
+    wide = frame.pivot_table(
+        index="file",
+        columns=["actual_label", "predicted_label"],
+        values="count",
+        aggfunc="sum",
+        fill_value=0,
+    )
+
+    # Labels of classes which were neither actual nor predicted are unknown
+    named = labels[labels != ""].reset_index()
+    known = pd.crosstab(named["file"], named["label"]).reindex(wide.index) > 0
+    known[MISSING_LABEL] = True
+    for actual, predicted in wide.columns:
+        wide[(actual, predicted)] = wide[(actual, predicted)].where(
+            known[actual] & known[predicted]
+        )
+    wide.columns = [
+        "{} {} -> {}".format(METRICS["confusion"], actual, predicted)
+        for actual, predicted in wide.columns
+    ]
+    return wide
@@ -1,59 +1,70 @@
+from joblib import Parallel, delayed
 from sklearn.neighbors import KernelDensity
 import numpy as np
 
+NUMERIC_TYPES = {"numeric", "real", "integer"}
 
-class CLMetric:
-    def __init__(self, params):
-        self.params = params
 
-    def findLikelihood(self, df, classes):
+def attribute_log_likelihood(attr, values, class_mask, query_mask, params):
+    """Log-probabilities of the query values of one attribute given a class.
+
+    Continuous attributes are estimated with a Kernel Density fitted on the
+    values of the class, discrete ones by the frequency of the value in the
+    class (-inf for values which do not occur in the class).
+    """
+    if attr[1].lower() in NUMERIC_TYPES:
+        kde = KernelDensity(**params)
+        kde.fit(values[class_mask, None])
+        return kde.score_samples(values[query_mask, None])
+
+    levels, inverse = np.unique(values, return_inverse=True)
+    counts = np.bincount(inverse[class_mask], minlength=len(levels))
+    with np.errstate(divide="ignore"):
+        return np.log(counts[inverse[query_mask]] / class_mask.sum())
 
-        # Adjusts dataframe by removing the class column
-        # df_without_class = df.iloc[:, :-1]
-        df_without_class = df
 
-        # Find unique classes
-        unique_classes = np.unique(classes)
+def class_log_likelihoods(df, classes, params, all_classes=False):
+    """Matrix of log-likelihoods of the instances (rows) under the classes.
 
-        # Number of all instances
-        num_instances = len(df_without_class)
+    Only the likelihood under the own class of the instance is computed
+    unless ``all_classes`` is set, other entries are left as -inf.
+    Attributes of a class are processed in ``n_jobs`` parallel jobs.
+    """
+    params = dict(params)
+    n_jobs = params.pop("n_jobs", 1)
 
-        # Likelihood of the instance belonging to the class
-        likelihood = [1] * num_instances
+    unique_classes, class_indexes = np.unique(np.asarray(classes), return_inverse=True)
+    log_likelihoods = np.full((len(df), len(unique_classes)), -np.inf)
+    query_mask = np.ones(len(df), dtype=bool)
 
-        # Iterates unique classes
-        for x in unique_classes:
-            class_df = df_without_class.loc[classes == x]
-            counter = 0
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for index in range(len(unique_classes)):
+            class_mask = class_indexes == index
+            if not all_classes:
+                query_mask = class_mask
 
-            # For each attribute of the class
-            for attr in class_df:
+            attributes_log_likelihood = parallel(
+                delayed(attribute_log_likelihood)(
+                    attr, df[attr].values, class_mask, query_mask, params
+                )
+                for attr in df
+            )
+            log_likelihoods[query_mask, index] = np.sum(
+                attributes_log_likelihood, axis=0
+            )
 
-                # Values for the given attribute
-                vals = class_df[attr]
+    return log_likelihoods, class_indexes
 
-                # If the attribute is a float it is a continuous variable
-                # so Kernel Density is used to determine probability
-                # if not isinstance(attributes_dict[attr],(list,)) and
-                # attributes_dict[attr].lower() in {"numeric", "real", "integer"}:
 
-                if attr[1].lower() in {"numeric", "real", "integer"}:
+class CLMetric:
+    def __init__(self, params):
+        self.params = params
+
+    def findLikelihood(self, df, classes):
 
-                    kde = KernelDensity(**self.params)
-                    kde.fit(vals[:, None])
-                    probs = np.exp(kde.score_samples(vals[:, None]))
+        log_likelihoods, class_indexes = class_log_likelihoods(df, classes, self.params)
 
-                    for index, prob in zip(
-                        [index for index, _ in vals.iteritems()], probs
-                    ):
-                        likelihood[index] *= prob
+        # Likelihood of the instance belonging to its class
+        likelihood = np.exp(log_likelihoods[np.arange(len(df)), class_indexes])
 
-                # Otherwise we count the number of occurences
-                else:
-                    counts = dict(zip(*np.unique(vals, return_counts=True)))
-                    length = len(vals)
-                    for index, row in vals.iteritems():
-                        likelihood[index] *= counts[row] / length
-                counter += 1
-        # return likelihood
-        return 1 - np.array(likelihood)
+        return 1 - likelihood
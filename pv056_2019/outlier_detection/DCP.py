@@ -4,23 +4,26 @@ from sklearn.tree import DecisionTreeClassifier
 
 
 class DCPMetric:
-    def countDCP(self, df, classes, minimum_impurity_split):
+    @staticmethod
+    def sameClassFractions(estimator, df, classes):
+        leafsIndexes = estimator.apply(df, check_input=True)
+
+        # leaf x class contingency table
+        _, classIndexes = np.unique(np.asarray(classes), return_inverse=True)
+        n_classes = classIndexes.max() + 1
+        n_nodes = estimator.tree_.node_count
+        counts = np.bincount(
+            leafsIndexes * n_classes + classIndexes, minlength=n_nodes * n_classes
+        ).reshape(n_nodes, n_classes)
 
-        values = np.empty([0, 0])
+        # fraction of instances in the same leaf which have the same class
+        sameClass = counts[leafsIndexes, classIndexes]
+        leafSize = counts.sum(axis=1)[leafsIndexes]
+        return (sameClass / leafSize) * -1
+
+    def countDCP(self, df, classes, minimum_impurity_split):
 
         estimator = DecisionTreeClassifier(min_impurity_split=minimum_impurity_split)
         estimator.fit(df, classes)
-        leafsIndexes = estimator.apply(df, check_input=True)
 
-        for index, _ in df.iterrows():
-            suma = 0
-            value = 0
-            for leafIndex, _ in df.iterrows():
-                if leafsIndexes[index] == leafsIndexes[leafIndex]:
-                    suma += 1
-                    if classes[index] == classes[leafIndex]:
-                        value += 1
-            values = np.append(values, np.full((1, 1), (value / suma) * -1))
-            # print("Count DCP for " + repr(index) + ". row of data.")
-
-        return values
+        return self.sameClassFractions(estimator, df, classes)
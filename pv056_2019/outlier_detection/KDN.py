@@ -1,22 +1,16 @@
 import numpy as np
 
-from sklearn.neighbors import NearestNeighbors
+from pv056_2019.outlier_detection.neighbors import kneighbors
 
-# TODO add prunning, make it faster
+# TODO add prunning
 
 
 class KDNMetric:
-    def countKDN(self, df, classes, k):
+    def countKDN(self, df, classes, k, **settings):
+        classes = np.asarray(classes)
 
-        values = np.empty([0, 0])
+        _, indices = kneighbors(df.values, k, **settings)
 
-        estimator = NearestNeighbors(n_neighbors=k)
-        estimator.fit(df.values)
-        _, indices = estimator.kneighbors()
-        for index, neighbors in enumerate(indices):
-            value = 0.0
-            for neighbor in neighbors:
-                if classes[index] != classes[neighbor]:
-                    value += 1.0
-            values = np.append(values, np.full((1, 1), value / k))
-        return values
+        # fraction of the k nearest neighbors with a different class
+        disagreeing = classes[indices] != classes[:, np.newaxis]
+        return disagreeing.sum(axis=1) / k
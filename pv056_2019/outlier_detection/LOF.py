@@ -0,0 +1,41 @@
+import numpy as np
+from sklearn.neighbors import LocalOutlierFactor
+
+from pv056_2019.outlier_detection.neighbors import kneighbors
+
+
+class LOFMetric:
+    """Local outlier factor of the training instances computed from their
+    nearest neighbours, equal to the one of
+    sklearn.neighbors.LocalOutlierFactor but with any backend of
+    neighbors.kneighbors (e.g. the approximate one)."""
+
+    def countLOF(self, values, n_neighbors=20, contamination=None, **settings):
+        # Same default as the installed sklearn ("legacy" in 0.20, "auto" later)
+        if contamination is None:
+            contamination = LocalOutlierFactor().contamination
+        n_neighbors = max(1, min(int(n_neighbors), len(values) - 1))
+        distances, indices = kneighbors(values, n_neighbors, **settings)
+
+        # Local reachability density of every instance
+        k_distances = distances[:, -1]
+        lrd = 1 / (np.mean(np.maximum(distances, k_distances[indices]), axis=1) + 1e-10)
+
+        # sklearn scores training instances as queries, one of their
+        # neighbours is then the instance itself at distance zero
+        rows = np.arange(len(values))[:, np.newaxis]
+        query_distances = np.hstack([np.zeros_like(rows, float), distances[:, :-1]])
+        query_indices = np.hstack([rows, indices[:, :-1]])
+        query_reach = np.maximum(query_distances, k_distances[query_indices])
+        query_lrd = 1 / (np.mean(query_reach, axis=1) + 1e-10)
+        scores = -np.mean(lrd[query_indices] / query_lrd[:, np.newaxis], axis=1)
+
+        if contamination == "auto":
+            offset = -1.5
+        else:
+            # "legacy" is the contamination of sklearn 0.20 before "auto"
+            if contamination == "legacy":
+                contamination = 0.1
+            training_scores = -np.mean(lrd[indices] / lrd[:, np.newaxis], axis=1)
+            offset = np.percentile(training_scores, 100.0 * float(contamination))
+        return scores - offset
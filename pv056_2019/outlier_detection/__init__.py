@@ -6,7 +6,7 @@ from typing import Any, Dict
 from sklearn.ensemble import IsolationForest
 from pv056_2019.outlier_detection.CL import CLMetric
 from pv056_2019.outlier_detection.CLD import CLDMetric
-from sklearn.neighbors import LocalOutlierFactor, NearestNeighbors
+from sklearn.neighbors import LocalOutlierFactor
 
 # from sklearn.neighbors import KNeighborsClassifier
 from pv056_2019.outlier_detection.F2 import F2Metric
@@ -17,9 +17,10 @@ from pv056_2019.outlier_detection.TD import TDMetric
 from pv056_2019.outlier_detection.DCP import DCPMetric
 from pv056_2019.outlier_detection.DS import DSMetric
 from pv056_2019.outlier_detection.KDN import KDNMetric
+from pv056_2019.outlier_detection.LOF import LOFMetric
+from pv056_2019.outlier_detection.neighbors import APPROXIMATE, kneighbors
 from pv056_2019.outlier_detection.CODB import CODBMetric
 
-
 DETECTORS: Dict[str, Any] = {}
 
 
@@ -48,6 +49,10 @@ class LOF(AbstractDetector):
     def compute_scores(self, dataframe: pd.DataFrame, classes: np.array):
         bin_dataframe = dataframe._binarize_categorical_values()
 
+        if self.settings.get("algorithm") == APPROXIMATE:
+            self.values = LOFMetric().countLOF(bin_dataframe.values, **self.settings)
+            return self
+
         self.clf = LocalOutlierFactor(**self.settings)
         self.clf.fit(bin_dataframe.values)
         self.values = self.clf._decision_function(bin_dataframe.values)
@@ -63,9 +68,7 @@ class NN(AbstractDetector):
         bin_dataframe = dataframe._binarize_categorical_values()
         if "n_neighbors" in self.settings:
             self.settings["n_neighbors"] = int(self.settings["n_neighbors"])
-        self.clf = NearestNeighbors(**self.settings)
-        self.clf.fit(bin_dataframe.values)
-        distances, _ = self.clf.kneighbors()
+        distances, _ = kneighbors(bin_dataframe.values, **self.settings)
         self.values = np.mean(distances, axis=1)
         return self
 
@@ -80,11 +83,13 @@ class KDN(AbstractDetector):
     data_type = "REAL"
 
     def compute_scores(self, dataframe: pd.DataFrame, classes: np.array):
-        if "n_neighbors" in self.settings:
-            k = int(self.settings["n_neighbors"])
+        # The other settings select the nearest neighbours backend
+        settings = dict(self.settings)
+        if "n_neighbors" in settings:
+            k = int(settings.pop("n_neighbors"))
         bin_dataframe = dataframe._binarize_categorical_values()
         self.clf = KDNMetric()
-        self.values = self.clf.countKDN(bin_dataframe, classes, k)
+        self.values = self.clf.countKDN(bin_dataframe, classes, k, **settings)
         # print("KDN done sucessfully!")
         return self
 
@@ -0,0 +1,307 @@
+import math
+
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+# Value of the "algorithm" parameter selecting RandomProjectionIndex, the
+# other values are the exact algorithms of sklearn.neighbors
+APPROXIMATE = "approximate"
+ALGORITHMS = ("auto", "ball_tree", "kd_tree", "brute", APPROXIMATE)
+# Number of values in one block of gathered rows
+BLOCK_SIZE = 2**22
+# Number of the nearest neighbours (and of the reverse neighbours) of a row
+# joined in one round of NN-descent
+MAX_JOINED = 10
+
+
+def kneighbors(values, n_neighbors=5, algorithm="auto", **settings):
+    """Distances and indexes of the nearest neighbours of every row.
+
+    A row is not its own neighbour. ``algorithm`` selects the backend, an
+    exact search of sklearn.neighbors.NearestNeighbors (the other settings
+    are its parameters) or the approximate RandomProjectionIndex (the other
+    settings are its parameters).
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(
+            "Algorithm {} is not supported. Supported algorithms are: {}".format(
+                algorithm, ", ".join(ALGORITHMS)
+            )
+        )
+
+    n_neighbors = int(n_neighbors)
+    if algorithm == APPROXIMATE:
+        return RandomProjectionIndex(values, **settings).kneighbors(n_neighbors)
+
+    estimator = NearestNeighbors(
+        n_neighbors=n_neighbors, algorithm=algorithm, **settings
+    )
+    estimator.fit(values)
+    return estimator.kneighbors()
+
+
+def _row_distances(values, rows, other_rows):
+    """Euclidean distances of pairs of rows, computed in blocks."""
+    distances = np.empty(len(rows))
+    block = max(1, BLOCK_SIZE // max(1, values.shape[1]))
+    for start in range(0, len(rows), block):
+        end = start + block
+        difference = values[rows[start:end]] - values[other_rows[start:end]]
+        distances[start:end] = np.sqrt(np.einsum("ij,ij->i", difference, difference))
+    return distances
+
+
+class RandomProjectionIndex:
+    """Approximate k nearest neighbours of the rows of a matrix.
+
+    Every one of ``n_trees`` random projection trees splits the rows at the
+    median of their projection on a random direction until the nodes have at
+    most ``leaf_size`` rows, ordering the rows so that close rows are close
+    in the order. The candidate neighbours of a row are the rows of its
+    groups of consecutive rows in the order of every tree. The result is
+    then refined by ``n_iter`` rounds of NN-descent (neighbours of the
+    neighbours are candidates as well). Distances are Euclidean and exact,
+    only some of the true neighbours may be missed.
+    """
+
+    def __init__(
+        self,
+        values,
+        n_trees: int = 8,
+        leaf_size: int = 30,
+        n_iter: int = 2,
+        random_state: int = 0,
+    ):
+        self.n_trees = int(n_trees)
+        self.leaf_size = int(leaf_size)
+        self.n_iter = int(n_iter)
+        self.random_state = int(random_state)
+        if self.n_trees < 1 or self.leaf_size < 1 or self.n_iter < 0:
+            raise ValueError(
+                "n_trees and leaf_size must be positive, n_iter non-negative"
+            )
+        self.values = np.asarray(values, dtype=np.float64)
+        # Trees and candidates are computed in single precision, only the
+        # distances of the found neighbours in double precision
+        self.coarse_values = self.values.astype(np.float32)
+
+    def _tree_order(self, random: np.random.RandomState) -> np.ndarray:
+        """Order of the rows by the leaves of one random projection tree."""
+        n_rows, n_columns = self.coarse_values.shape
+        order = np.arange(n_rows)
+        labels = np.zeros(n_rows, dtype=np.int64)
+        depth = max(0, math.ceil(math.log2(max(1, n_rows / self.leaf_size))))
+        block = max(1, BLOCK_SIZE // max(1, n_columns))
+        for level in range(depth):
+            # The direction of a node is the difference of two of its rows,
+            # rows are grouped by their node in the order of the last level
+            sizes = np.bincount(labels, minlength=2**level)
+            starts = np.cumsum(sizes) - sizes
+            pairs = starts[:, np.newaxis] + (
+                random.random_sample((2**level, 2)) * sizes[:, np.newaxis]
+            ).astype(np.int64)
+            pairs = order[np.minimum(pairs, n_rows - 1)]
+            directions = (
+                self.coarse_values[pairs[:, 0]] - self.coarse_values[pairs[:, 1]]
+            )
+            projections = np.empty(n_rows, dtype=np.float32)
+            for start in range(0, n_rows, block):
+                end = start + block
+                projections[start:end] = np.einsum(
+                    "ij,ij->i",
+                    self.coarse_values[start:end],
+                    directions[labels[start:end]],
+                )
+
+            # Rows sorted by their node and projection, the first half of
+            # every node goes left
+            order = np.lexsort((projections, labels))
+            sorted_labels = labels[order]
+            ranks = np.arange(n_rows) - starts[sorted_labels]
+            labels[order] = 2 * sorted_labels + (ranks >= sizes[sorted_labels] // 2)
+        return order
+
+    def _group_distances(self, groups: np.ndarray) -> np.ndarray:
+        """Squared distances of all pairs of rows within every group (a row
+        of ``groups``)."""
+        members = self.coarse_values[groups]
+        squares = self.squares[groups]
+        distances = (
+            squares[:, :, np.newaxis]
+            + squares[:, np.newaxis, :]
+            - 2 * np.matmul(members, members.transpose(0, 2, 1))
+        )
+        return np.maximum(distances, 0)
+
+    def _group_block(self, group_size: int) -> int:
+        """Number of groups whose rows fit in one block."""
+        return max(1, BLOCK_SIZE // (group_size * max(1, self.values.shape[1])))
+
+    def _tree_candidates(self, order: np.ndarray, group_size: int):
+        """Candidates of every row from two partitions of the tree order into
+        groups of consecutive rows, the second one shifted by half a group.
+        """
+        n_rows = len(order)
+        rows = []
+        candidates = []
+        distances = []
+        for shift in (0, group_size // 2):
+            n_groups = -(-n_rows // group_size)
+            # The last group is filled up with rows from the start
+            groups = np.resize(np.roll(order, -shift), (n_groups, group_size))
+            groups_rows = np.repeat(groups[:, :, np.newaxis], group_size, axis=2)
+            groups_candidates = np.repeat(groups[:, np.newaxis, :], group_size, axis=1)
+            rows.append(groups_rows.reshape(-1, group_size)[:, 0])
+            candidates.append(groups_candidates.reshape(-1, group_size))
+            block = self._group_block(group_size)
+            distances.append(
+                np.concatenate(
+                    [
+                        self._group_distances(groups[start : start + block])
+                        for start in range(0, n_groups, block)
+                    ]
+                ).reshape(-1, group_size)
+            )
+
+        tree_candidates = np.empty((n_rows, 2 * group_size), dtype=np.int64)
+        tree_distances = np.empty(tree_candidates.shape, dtype=np.float32)
+        for partition in range(2):
+            columns = slice(partition * group_size, (partition + 1) * group_size)
+            tree_candidates[rows[partition], columns] = candidates[partition]
+            tree_distances[rows[partition], columns] = distances[partition]
+        return tree_distances, tree_candidates
+
+    def _local_join(self, distances: np.ndarray, indexes: np.ndarray):
+        """One round of NN-descent.
+
+        A row, its nearest neighbours and the rows it is one of the nearest
+        neighbours of (at most MAX_JOINED of both) are all candidate
+        neighbours of each other, so a row gets the neighbours of its
+        neighbours as candidates.
+        """
+        n_rows, n_neighbors = indexes.shape
+        rows = np.arange(n_rows)
+        joined = min(n_neighbors, MAX_JOINED)
+        nearest = indexes[:, :joined]
+        sources = np.repeat(rows, joined)
+        order = np.argsort(nearest.ravel(), kind="stable")
+        reverse_targets = nearest.ravel()[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = reverse_targets[1:] != reverse_targets[:-1]
+        positions = np.arange(len(order))
+        ranks = positions - np.maximum.accumulate(np.where(first, positions, 0))
+        reverse = np.tile(rows[:, np.newaxis], joined)
+        kept = ranks < joined
+        reverse[reverse_targets[kept], ranks[kept]] = sources[order][kept]
+        groups = np.hstack([rows[:, np.newaxis], nearest, reverse])
+
+        # Only candidates closer than the farthest neighbour of their target
+        group_size = groups.shape[1]
+        block = self._group_block(group_size)
+        farthest = distances[:, -1]
+        found = []
+        for start in range(0, n_rows, block):
+            block_groups = groups[start : start + block]
+            group_distances = self._group_distances(block_groups)
+            group, target, candidate = np.nonzero(
+                group_distances < farthest[block_groups][:, :, np.newaxis]
+            )
+            targets = block_groups[group, target]
+            candidates = block_groups[group, candidate]
+            other = targets != candidates
+            found.append(
+                (
+                    targets[other],
+                    candidates[other],
+                    group_distances[group, target, candidate][other],
+                )
+            )
+        targets = np.concatenate([targets for targets, _, _ in found])
+        candidates = np.concatenate([candidates for _, candidates, _ in found])
+        candidate_distances = np.concatenate([distances for _, _, distances in found])
+
+        # Current neighbours of the updated rows compete with the candidates,
+        # (target, candidate) pairs are made distinct by their keys
+        updated = np.unique(targets)
+        keys, first_index = np.unique(
+            np.concatenate(
+                [
+                    np.repeat(updated, n_neighbors) * n_rows + indexes[updated].ravel(),
+                    targets * n_rows + candidates,
+                ]
+            ),
+            return_index=True,
+        )
+        candidate_distances = np.concatenate(
+            [distances[updated].ravel(), candidate_distances]
+        )[first_index]
+        targets, candidates = np.divmod(keys, n_rows)
+
+        order = np.lexsort((candidate_distances, targets))
+        targets = targets[order]
+        first = np.ones(len(targets), dtype=bool)
+        first[1:] = targets[1:] != targets[:-1]
+        positions = np.arange(len(targets))
+        ranks = positions - np.maximum.accumulate(np.where(first, positions, 0))
+        nearest = ranks < n_neighbors
+        distances[targets[nearest], ranks[nearest]] = candidate_distances[
+            order[nearest]
+        ]
+        indexes[targets[nearest], ranks[nearest]] = candidates[order[nearest]]
+
+    def kneighbors(self, n_neighbors: int):
+        n_rows = len(self.values)
+        if not 0 < n_neighbors < n_rows:
+            raise ValueError(
+                "Expected 0 < n_neighbors < n_samples, got {} and {}".format(
+                    n_neighbors, n_rows
+                )
+            )
+
+        # Every group gives at least n_neighbors distinct candidates
+        group_size = min(n_rows, max(self.leaf_size, n_neighbors + 1))
+        random = np.random.RandomState(self.random_state)
+        self.squares = np.einsum("ij,ij->i", self.coarse_values, self.coarse_values)
+        # Squared distances, the self-indexes are placeholders
+        distances = np.full((n_rows, n_neighbors), np.inf, dtype=np.float32)
+        indexes = np.tile(np.arange(n_rows)[:, np.newaxis], n_neighbors)
+        for _ in range(self.n_trees):
+            tree_distances, tree_indexes = self._tree_candidates(
+                self._tree_order(random), group_size
+            )
+            distances, indexes = self._nearest(
+                np.hstack([distances, tree_distances]),
+                np.hstack([indexes, tree_indexes]),
+                n_neighbors,
+            )
+        for _ in range(self.n_iter):
+            self._local_join(distances, indexes)
+
+        # Distances are computed again directly, the matrix products round
+        # distances of close rows
+        distances = _row_distances(
+            self.values, np.repeat(np.arange(n_rows), n_neighbors), indexes.ravel()
+        ).reshape(indexes.shape)
+        by_distance = np.argsort(distances, axis=1, kind="stable")
+        rows = np.arange(n_rows)[:, np.newaxis]
+        return distances[rows, by_distance], indexes[rows, by_distance]
+
+    @staticmethod
+    def _nearest(distances, indexes, n_neighbors):
+        """The n_neighbors nearest distinct candidates of every row except
+        the row itself, sorted by distance."""
+        rows = np.arange(len(indexes))[:, np.newaxis]
+        by_index = np.argsort(indexes, axis=1, kind="stable")
+        indexes = indexes[rows, by_index]
+        distances = distances[rows, by_index]
+        duplicate = np.zeros(indexes.shape, dtype=bool)
+        duplicate[:, 1:] = indexes[:, 1:] == indexes[:, :-1]
+        distances[duplicate | (indexes == rows)] = np.inf
+
+        nearest = np.argpartition(distances, n_neighbors - 1, axis=1)[:, :n_neighbors]
+        nearest_distances = distances[rows, nearest]
+        by_distance = np.argsort(nearest_distances, axis=1, kind="stable")
+        return (
+            nearest_distances[rows, by_distance],
+            indexes[rows, nearest[rows, by_distance]],
+        )
@@ -0,0 +1,178 @@
+import os
+import resource
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+STATUS_TIMEOUT = "timeout"
+STATUS_CRASHED = "crashed"
+STDERR_TAIL_SIZE = 2048
+
+
+class JobResult(NamedTuple):
+    """Result of one output of a job, sent from a worker to the parent."""
+
+    key: str
+    output: str
+    inputs_hash: str
+    status: str
+    runtime: float
+    peak_rss: Optional[int] = None
+    stderr_tail: str = ""
+
+
+def self_peak_rss() -> int:
+    """Peak resident set size of this process in KiB (Linux units)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_process(
+    args: List[str], timeout: Optional[float] = None
+) -> Tuple[int, int, str, bool]:
+    """Runs a command, returns its exit code, peak RSS in KiB, end of its
+    stderr and whether it was killed after ``timeout`` seconds."""
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=stderr_file)
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(timeout, kill) if timeout else None
+        if timer is not None:
+            timer.start()
+        try:
+            _, wait_status, rusage = os.wait4(process.pid, 0)
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+        if os.WIFSIGNALED(wait_status):
+            process.returncode = -os.WTERMSIG(wait_status)
+        else:
+            process.returncode = os.WEXITSTATUS(wait_status)
+
+        stderr_file.seek(max(0, stderr_file.tell() - STDERR_TAIL_SIZE))
+        stderr_tail = stderr_file.read().decode("UTF-8", "replace")
+
+    return process.returncode, rusage.ru_maxrss, stderr_tail, timed_out.is_set()
+
+
+# Initializers which already ran in this (worker) process
+_INITIALIZED: List[Tuple[Callable, Tuple]] = []
+
+
+def _initialized_call(
+    function: Callable[[Any], List[JobResult]],
+    initializer: Callable,
+    initargs: Tuple,
+    task: Any,
+) -> List[JobResult]:
+    """Runs ``function`` on a task, first running ``initializer`` once in the
+    worker process (ProcessPoolExecutor takes an initializer only since
+    Python 3.7)."""
+    if (initializer, initargs) not in _INITIALIZED:
+        initializer(*initargs)
+        _INITIALIZED.append((initializer, initargs))
+    return function(task)
+
+
+def run_pool(
+    function: Callable[[Any], List[JobResult]],
+    tasks: List[Tuple[int, Any]],
+    n_jobs: int,
+    failed_results: Callable[[Any, str, str], List[JobResult]],
+    retries: int = 0,
+    initializer: Optional[Callable] = None,
+    initargs: Tuple = (),
+    memory: Optional[Dict[int, int]] = None,
+    memory_budget_mb: Optional[int] = None,
+) -> Iterator[Tuple[int, List[JobResult]]]:
+    """Runs ``function`` on tasks in worker processes, yields their results.
+
+    Tasks are submitted in the given order and at most ``n_jobs`` at a time.
+    A task with an unsuccessful result is run again up to ``retries`` times,
+    only its final results are yielded. When a worker process dies, the
+    tasks running at that moment count as failed attempts (their results
+    are made by ``failed_results(task, status, message)``) and the pool is
+    started again for the remaining tasks. ``initializer(*initargs)`` runs
+    in every worker process before its first task.
+
+    With ``memory_budget_mb``, the expected memory of the running tasks
+    (``memory[task_index]`` in MiB) is kept under the budget: the first
+    pending task which fits is started next. A task larger than the budget
+    is started only when nothing else is running.
+    """
+    attempts: Dict[int, int] = {index: 0 for index, _ in tasks}
+    memory = memory or {}
+    pending = list(tasks)
+
+    def next_task(running_indexes: List[int]) -> Optional[int]:
+        if memory_budget_mb is None:
+            return 0
+        free_mb = memory_budget_mb - sum(
+            memory.get(index, 0) for index in running_indexes
+        )
+        for position, (index, _) in enumerate(pending):
+            if memory.get(index, 0) <= free_mb:
+                return position
+        return None if running_indexes else 0
+
+    while pending:
+        executor = ProcessPoolExecutor(n_jobs)
+        running: Dict[Any, Tuple[int, Any]] = {}
+        try:
+            while pending or running:
+                while pending and len(running) < n_jobs:
+                    position = next_task([index for index, _ in running.values()])
+                    if position is None:
+                        break
+                    index, task = pending.pop(position)
+                    if initializer is None:
+                        future = executor.submit(function, task)
+                    else:
+                        future = executor.submit(
+                            _initialized_call, function, initializer, initargs, task
+                        )
+                    running[future] = (index, task)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    index, task = running.pop(future)
+                    attempts[index] += 1
+                    try:
+                        results = future.result()
+                    except BrokenProcessPool as exc:
+                        broken = True
+                        results = failed_results(task, STATUS_CRASHED, str(exc))
+                    except Exception as exc:
+                        results = failed_results(task, STATUS_ERROR, repr(exc))
+
+                    if attempts[index] <= retries and any(
+                        result.status != STATUS_OK for result in results
+                    ):
+                        pending.insert(0, (index, task))
+                    else:
+                        yield index, results
+
+                if broken:
+                    # All running tasks are lost with the pool
+                    for future, (index, task) in running.items():
+                        attempts[index] += 1
+                        if attempts[index] <= retries:
+                            pending.insert(0, (index, task))
+                        else:
+                            yield index, failed_results(
+                                task, STATUS_CRASHED, "Worker process died"
+                            )
+                    running = {}
+                    break
+        finally:
+            executor.shutdown(wait=not running)
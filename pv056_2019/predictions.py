@@ -0,0 +1,101 @@
+import csv
+import os
+from typing import IO, Any, Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+PREDICTIONS_SUFFIX = ".npz"
+# Class of instances with a missing value
+MISSING_CLASS = -1
+
+
+def _class_indexes(values: pd.Series, classes: Dict[int, str]) -> np.ndarray:
+    # Values are categorical, only the few distinct ones are parsed, the
+    # last index is of the missing values
+    categories = values.cat.categories
+    category_indexes = np.full(len(categories) + 1, MISSING_CLASS, dtype=np.int16)
+    for position, value in enumerate(categories):
+        if ":" in value:
+            index, label = value.split(":", 1)
+            category_indexes[position] = int(index) - 1
+            classes[int(index) - 1] = label
+    return category_indexes[values.cat.codes.to_numpy()]
+
+
+def read_weka_predictions(csv_file: IO[str]) -> Dict[str, Any]:
+    """Columns of a prediction CSV written by Weka (``-p first``).
+
+    Returns the instance IDs, the actual and predicted class indexes, the
+    correct flags (rows without the ``+`` error mark), the class labels and,
+    when Weka printed the class distribution, the per-class probabilities.
+    """
+    # Columns of the distribution have empty names, the header is read
+    # separately and the columns are numbered
+    header = next(csv.reader([csv_file.readline()]))
+    if header[4] == "distribution":
+        # One column per class, the predicted one is marked with "*"
+        n_classes = 1
+        while 4 + n_classes < len(header) and header[4 + n_classes] == "":
+            n_classes += 1
+        id_column = 4 + n_classes
+    else:
+        n_classes = 0
+        id_column = 5
+
+    rows = pd.read_csv(
+        csv_file,
+        header=None,
+        names=list(range(len(header))),
+        dtype={1: "category", 2: "category", 3: "category"},
+        na_values={id_column: ["?"]},
+        float_precision="round_trip",
+        low_memory=False,
+    )
+
+    classes: Dict[int, str] = {}
+    actual = _class_indexes(rows[1], classes)
+    predicted = _class_indexes(rows[2], classes)
+    record = {
+        "actual": actual,
+        "predicted": predicted,
+        "correct": (rows[3] != "+").to_numpy(),
+    }
+
+    if n_classes:
+        distribution = np.empty((len(rows), n_classes), dtype=np.float32)
+        for position in range(n_classes):
+            values = rows[4 + position]
+            if values.dtype == object:
+                values = values.str.lstrip("*")
+            distribution[:, position] = values.astype(float)
+        record["distribution"] = distribution
+
+    record["id"] = rows[id_column].to_numpy(dtype=float)
+    n_classes = max(
+        max(classes, default=-1) + 1,
+        record["distribution"].shape[1] if "distribution" in record else 0,
+    )
+    # Labels of classes which were neither actual nor predicted are unknown
+    record["classes"] = np.array([classes.get(index, "") for index in range(n_classes)])
+    return record
+
+
+def condense_predictions(csv_path: str, output_path: str):
+    """Replaces a Weka prediction CSV by a compact ``.npz`` record."""
+    with open(csv_path, newline="") as csv_file:
+        record = read_weka_predictions(csv_file)
+
+    tmp_path = "{}.tmp-{}{}".format(output_path, os.getpid(), PREDICTIONS_SUFFIX)
+    np.savez_compressed(tmp_path, **record)
+    os.replace(tmp_path, output_path)
+    os.remove(csv_path)
+
+
+def load_predictions(
+    npz_file: Union[str, IO[bytes]], keys: Optional[Iterable[str]] = None
+) -> Dict[str, np.ndarray]:
+    """Arrays of a predictions record, only ``keys`` of them when given."""
+    with np.load(npz_file) as record:
+        files = record.files if keys is None else set(keys) & set(record.files)
+        return {key: record[key] for key in files}
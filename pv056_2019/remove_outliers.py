@@ -3,10 +3,142 @@ import csv
 import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
 
-from pv056_2019.data_loader import DataLoader
+import numpy as np
+import pandas as pd
+
+from pv056_2019.arff_writer import dump_arff_rows, encode_rows
+from pv056_2019.data_loader import DataFrameArff, DataLoader
 from pv056_2019.schemas import RemoveOutliersConfigSchema
-from pv056_2019.utils import OD_VALUE_NAME
+from pv056_2019.utils import (
+    ID_NAME,
+    OD_SCORES_SUFFIX,
+    OD_VALUE_NAME,
+    REMOVED_MASK_SUFFIX,
+)
+
+
+def od_file_paths(conf: RemoveOutliersConfigSchema) -> List[str]:
+    """Train files with OD values followed by OD scores files."""
+    train_data_loader = DataLoader(conf.train_od_dir, regex=r".*_train\.arff")
+
+    scores_file_paths = sorted(
+        os.path.join(conf.train_od_dir, x)
+        for x in os.listdir(conf.train_od_dir)
+        if x.endswith(OD_SCORES_SUFFIX)
+    )
+    if scores_file_paths and conf.train_split_dir is None:
+        raise ValueError("train_split_dir is required to join OD scores files")
+
+    return train_data_loader.file_paths + scores_file_paths
+
+
+def load_od_frame(conf: RemoveOutliersConfigSchema, file_path: str) -> DataFrameArff:
+    if not file_path.endswith(OD_SCORES_SUFFIX):
+        return DataLoader._load_arff_file(
+            file_path, conf.arff_cache_dir, conf.arff_reader
+        )
+
+    if conf.train_split_dir is None:
+        raise ValueError("train_split_dir is required to join OD scores files")
+
+    name_split = os.path.basename(file_path).split("_")
+    train_file_path = os.path.join(
+        conf.train_split_dir, "_".join(name_split[:2]) + "_train.arff"
+    )
+    dataframe = DataLoader._load_arff_file(
+        train_file_path, conf.arff_cache_dir, conf.arff_reader
+    )
+
+    scores = np.load(file_path)
+    od_values = pd.Series(scores[OD_VALUE_NAME], index=scores[ID_NAME])
+    return dataframe.with_od_values(od_values.reindex(dataframe[ID_NAME]).values)
+
+
+def remove_outliers(
+    conf: RemoveOutliersConfigSchema, train_file_path: str
+) -> List[List[str]]:
+    """Writes the train file without the largest outliers for every percentage.
+
+    The rows kept for all percentages come from one sort of the OD values and
+    every value is formatted only once for all the written files. In the
+    ``mask`` mode, one train file with rows sorted by their OD values is
+    written instead, with a mask of its kept rows for every percentage.
+    """
+    dataframe = load_od_frame(conf, train_file_path)
+    if OD_VALUE_NAME not in dataframe.columns:
+        print(
+            "Skipping {}. File does not have an OD_VALUE.".format(train_file_path),
+            flush=True,
+            file=sys.stderr,
+        )
+        return []
+
+    percentages = (
+        conf.percentage if isinstance(conf.percentage, list) else [conf.percentage]
+    )
+    masks = dataframe.od_quantile_masks(
+        [1 - (percentage / 100) for percentage in percentages]
+    )
+
+    arff_data = dict(dataframe._arff_data)
+    arff_data["attributes"] = [
+        x for x in arff_data["attributes"] if x[0] != OD_VALUE_NAME
+    ]
+    lines = encode_rows(dataframe.drop(columns=OD_VALUE_NAME))
+
+    name_split = os.path.basename(train_file_path).split("_")
+    name_split[-1] = "train.arff"
+    test_file_path = os.path.join(
+        conf.test_split_dir, "_".join(name_split[:2]) + "_test.arff"
+    )
+    od_config_path = os.path.join(conf.train_od_dir, name_split[2] + ".json")
+
+    if conf.removed_output == "mask":
+        # Removed rows are then a range at the end of the file for Weka
+        order = np.argsort(dataframe[OD_VALUE_NAME].values, kind="stable")
+        file_save_path = os.path.join(conf.train_removed_dir, "_".join(name_split))
+        with open(file_save_path, "w") as output_file:
+            dump_arff_rows(lines[order], arff_data, output_file)
+
+        datasets_output = []
+        for percentage, mask in zip(percentages, masks):
+            print("   ", train_file_path, "{}% (mask)".format(percentage), flush=True)
+            mask_name = "_".join(name_split[:-1]) + "_removed-{:03d}".format(percentage)
+            mask_save_path = os.path.join(
+                conf.train_removed_dir, mask_name + REMOVED_MASK_SUFFIX
+            )
+            np.save(mask_save_path, mask[order])
+            datasets_output.append(
+                [file_save_path, test_file_path, od_config_path, mask_save_path]
+            )
+        return datasets_output
+
+    datasets_output = []
+    for percentage, mask in zip(percentages, masks):
+        try:
+            print("   ", train_file_path, "{}%".format(percentage), flush=True)
+            file_name = "_".join(
+                name_split[:-1] + ["removed-{:03d}".format(percentage), "train.arff"]
+            )
+            file_save_path = os.path.join(conf.train_removed_dir, file_name)
+
+            with open(file_save_path, "w") as output_file:
+                dump_arff_rows(lines[mask], arff_data, output_file)
+
+            datasets_output.append([file_save_path, test_file_path, od_config_path])
+        except Exception as exc:
+            print(
+                "Error:",
+                train_file_path,
+                "{}%".format(percentage),
+                exc,
+                file=sys.stderr,
+            )
+
+    return datasets_output
 
 
 def main():
@@ -26,73 +158,25 @@ def main():
     with open(args["config_file"]) as json_file:
         conf = RemoveOutliersConfigSchema(**json.load(json_file))
 
-    train_data_loader = DataLoader(conf.train_od_dir, regex=r".*_train\.arff")
+    print("Removing {}%".format(conf.percentage), flush=True)
 
     datasets_output = []
-
+    executor = ProcessPoolExecutor(conf.n_jobs)
     try:
-        print("Removing {}%".format(conf.percentage), flush=True)
-
-        for dataframe, train_file_path in zip(
-            train_data_loader.load_files(), train_data_loader.file_paths
-        ):
-            if OD_VALUE_NAME not in dataframe.columns:
-                print(
-                    "Skipping {}. File does not have an OD_VALUE.".format(
-                        train_file_path
-                    ),
-                    flush=True,
-                    file=sys.stderr,
-                )
-                continue
-
-            percentages = (
-                conf.percentage
-                if isinstance(conf.percentage, list)
-                else [conf.percentage]
-            )
-
-            for percentage in percentages:
-                try:
-                    new_frame = dataframe.select_by_od_quantile(1 - (percentage / 100))
-                    new_frame.pop(OD_VALUE_NAME)
-                    new_frame._arff_data["attributes"] = [
-                        x
-                        for x in new_frame._arff_data["attributes"]
-                        if x[0] != OD_VALUE_NAME
-                    ]
-                    print("   ", train_file_path, "{}%".format(percentage))
-                    name_split = os.path.basename(train_file_path).split("_")
-                    name_split.insert(-1, "removed-{:03d}".format(percentage))
-
-                    file_name = "_".join(name_split)
-                    file_save_path = os.path.join(conf.train_removed_dir, file_name)
-
-                    new_frame.arff_dump(file_save_path)
-
-                    datasets_output.append(
-                        [
-                            file_save_path,
-                            os.path.join(
-                                conf.test_split_dir,
-                                "_".join(name_split[:2]) + "_test.arff",
-                            ),
-                            os.path.join(conf.train_od_dir, name_split[2] + ".json"),
-                        ]
-                    )
-                except KeyboardInterrupt as keyb:
-                    raise keyb
-                except Exception as exc:
-                    print(
-                        "Error:",
-                        train_file_path,
-                        "{}%".format(percentage),
-                        exc,
-                        file=sys.stderr,
-                    )
-
+        file_paths = od_file_paths(conf)
+        futures = [
+            executor.submit(remove_outliers, conf, file_path)
+            for file_path in file_paths
+        ]
+        for file_path, future in zip(file_paths, futures):
+            try:
+                datasets_output += future.result()
+            except Exception as exc:
+                print("Error:", file_path, exc, file=sys.stderr, flush=True)
     except KeyboardInterrupt:
         print("\nInterupted!", flush=True, file=sys.stderr)
+    finally:
+        executor.shutdown(wait=False)
 
     with open(args["datasets_file"], "w") as datasets_file:
         writer = csv.writer(datasets_file, delimiter=",")
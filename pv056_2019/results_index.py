@@ -0,0 +1,367 @@
+import io
+import json
+import os
+import sqlite3
+import tarfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from pv056_2019.metrics import class_auc, confusion_matrix
+from pv056_2019.predictions import (
+    MISSING_CLASS,
+    PREDICTIONS_SUFFIX,
+    load_predictions,
+    read_weka_predictions,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    file TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    dataset TEXT NOT NULL,
+    split TEXT NOT NULL,
+    conf_hash TEXT NOT NULL,
+    removed INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    total INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS archives (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS configs (
+    conf_hash TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    classifier TEXT,
+    od_name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS confusion (
+    file TEXT NOT NULL,
+    actual INTEGER NOT NULL,
+    predicted INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (file, actual, predicted)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS classes (
+    file TEXT NOT NULL,
+    class INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    auc REAL,
+    PRIMARY KEY (file, class)
+) WITHOUT ROWID;
+"""
+# Indexes of other versions are built again
+SCHEMA_VERSION = 2
+TABLES = ("results", "archives", "configs", "confusion", "classes")
+RESULT_SUFFIXES = (".csv", PREDICTIONS_SUFFIX)
+# Files parsed by one worker at a time
+CHUNK_SIZE = 64
+
+
+def parse_result_name(file_name: str) -> Tuple[str, str, str, int]:
+    """Dataset, split, configuration hash and removed percentage of a
+    ``<dataset>_<split>_<classifier>_<hash>[_removed-NNN].<csv|npz>`` file."""
+    file_split = os.path.splitext(file_name)[0].split("_")
+    removed = 0
+    if file_split[-1].startswith("removed-"):
+        removed = int(file_split.pop()[len("removed-") :])
+
+    dataset, split, _, conf_hash = file_split
+    return dataset, split, conf_hash, removed
+
+
+def read_predictions(
+    file_name: str, result_file: Union[str, IO[bytes]]
+) -> Dict[str, np.ndarray]:
+    """Predictions of a Weka CSV or of a predictions record."""
+    if file_name.endswith(PREDICTIONS_SUFFIX):
+        # IDs are not needed
+        return load_predictions(
+            result_file, ("actual", "predicted", "correct", "classes", "distribution")
+        )
+
+    if isinstance(result_file, str):
+        with open(result_file, newline="") as csv_file:
+            return read_weka_predictions(csv_file)
+    return read_weka_predictions(io.TextIOWrapper(result_file, newline=""))
+
+
+ResultRecord = Tuple[Tuple[Any, ...], List[Tuple[Any, ...]], List[Tuple[Any, ...]]]
+
+
+def result_record(
+    file_name: str, mtime_ns: int, size: int, result_file: Union[str, IO[bytes]]
+) -> ResultRecord:
+    """Rows of a prediction file in the results, confusion and classes tables.
+
+    All of them are computed from one read of the file.
+    """
+    dataset, split, conf_hash, removed = parse_result_name(file_name)
+    predictions = read_predictions(file_name, result_file)
+    correct = predictions["correct"]
+    n_classes = len(predictions["classes"])
+
+    counts = confusion_matrix(
+        predictions["actual"], predictions["predicted"], n_classes
+    )
+    actual, predicted = np.nonzero(counts)
+    confusion = [
+        # The last column counts missing predictions
+        (file_name, int(a), int(p) if p < n_classes else MISSING_CLASS, int(count))
+        for a, p, count in zip(actual, predicted, counts[actual, predicted])
+    ]
+
+    if "distribution" in predictions:
+        auc = class_auc(predictions["actual"], predictions["distribution"])
+    else:
+        auc = np.full(n_classes, np.nan)
+    classes = [
+        (file_name, index, str(label), None if np.isnan(value) else float(value))
+        for index, (label, value) in enumerate(zip(predictions["classes"], auc))
+    ]
+
+    result = (
+        file_name,
+        mtime_ns,
+        size,
+        dataset,
+        split,
+        conf_hash,
+        removed,
+        int(correct.sum()),
+        len(correct),
+    )
+    return result, confusion, classes
+
+
+def config_record(
+    file_name: str, mtime_ns: int, size: int, json_file: IO
+) -> Tuple[Any, ...]:
+    config = json.load(json_file)
+    return (
+        config_hash(file_name),
+        mtime_ns,
+        size,
+        config["model_config"].get("class_name"),
+        config["ad_config"].get("name", ""),
+    )
+
+
+def config_hash(file_name: str) -> str:
+    return file_name.split("_")[1].replace(".json", "")
+
+
+def _file_result_record(item: Tuple[str, str, int, int]) -> ResultRecord:
+    file_path, file_name, mtime_ns, size = item
+    return result_record(file_name, mtime_ns, size, file_path)
+
+
+def archive_records(
+    archive_path: str,
+) -> Tuple[List[Tuple[Any, ...]], List[ResultRecord]]:
+    """Configuration and result records of all files in a tar archive.
+
+    The archive is read as a stream, its members are never extracted to disk.
+    """
+    configs = []
+    results = []
+    with tarfile.open(archive_path, "r|*") as archive:
+        for member in archive:
+            file_name = os.path.basename(member.name)
+            if not member.isfile() or not file_name.endswith(
+                RESULT_SUFFIXES + (".json",)
+            ):
+                continue
+
+            extracted_file = archive.extractfile(member)
+            if extracted_file is None:
+                continue
+            # Members of a streamed archive can not be seeked, one is small
+            member_file = io.BytesIO(extracted_file.read())
+            mtime_ns = int(member.mtime) * 10**9
+            if file_name.endswith(".json"):
+                configs.append(
+                    config_record(file_name, mtime_ns, member.size, member_file)
+                )
+            else:
+                results.append(
+                    result_record(file_name, mtime_ns, member.size, member_file)
+                )
+
+    return configs, results
+
+
+class ResultsIndex:
+    """SQLite index of classifier results, one row per prediction file.
+
+    Besides the number of correct predictions, the non-zero cells of the
+    confusion matrix and the class labels with their one-vs-rest AUC (when
+    the file has the class distribution) are kept for every file.
+
+    A prediction file (or a tar archive of them) is read only when it is not
+    in the index yet or when its mtime or size changed. Rows are keyed by the
+    file name, rows of files which are no longer in the results directory
+    are kept, so results of several directories and archives can be
+    collected in one index. Without ``index_path``, the index lives in
+    memory.
+    """
+
+    def __init__(self, index_path: Optional[str] = None):
+        self.connection = sqlite3.connect(index_path or ":memory:")
+        (version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            with self.connection:
+                for table in TABLES:
+                    self.connection.execute("DROP TABLE IF EXISTS {}".format(table))
+            self.connection.execute("PRAGMA user_version = {}".format(SCHEMA_VERSION))
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def _indexed(self, table: str, key: str) -> Dict[str, Tuple[int, int]]:
+        cursor = self.connection.execute(
+            "SELECT {}, mtime_ns, size FROM {}".format(key, table)
+        )
+        return {name: (mtime_ns, size) for name, mtime_ns, size in cursor}
+
+    def update_configs(self, results_dir: str) -> int:
+        indexed = self._indexed("configs", "conf_hash")
+        records = []
+        for file_name in os.listdir(results_dir):
+            if not file_name.endswith(".json"):
+                continue
+            file_path = os.path.join(results_dir, file_name)
+            stat = os.stat(file_path)
+            if indexed.get(config_hash(file_name)) == (stat.st_mtime_ns, stat.st_size):
+                continue
+
+            with open(file_path) as config_file:
+                records.append(
+                    config_record(
+                        file_name, stat.st_mtime_ns, stat.st_size, config_file
+                    )
+                )
+
+        self._insert_configs(records)
+        return len(records)
+
+    def update_results(self, results_dir: str, n_jobs: int = 1) -> int:
+        """Indexes new and changed prediction files, returns their number."""
+        indexed = self._indexed("results", "file")
+        items: List[Tuple[str, str, int, int]] = []
+        for file_name in os.listdir(results_dir):
+            if not file_name.endswith(RESULT_SUFFIXES):
+                continue
+            file_path = os.path.join(results_dir, file_name)
+            stat = os.stat(file_path)
+            if indexed.get(file_name) != (stat.st_mtime_ns, stat.st_size):
+                items.append((file_path, file_name, stat.st_mtime_ns, stat.st_size))
+
+        if n_jobs > 1 and len(items) > CHUNK_SIZE:
+            with ProcessPoolExecutor(n_jobs) as executor:
+                self._insert_results(
+                    executor.map(_file_result_record, items, chunksize=CHUNK_SIZE)
+                )
+        else:
+            self._insert_results(map(_file_result_record, items))
+        return len(items)
+
+    def update_archives(self, archive_paths: List[str], n_jobs: int = 1) -> int:
+        """Indexes all files of new and changed tar archives, one archive per
+        worker, returns the number of read archives."""
+        indexed = self._indexed("archives", "path")
+        items = []
+        for archive_path in archive_paths:
+            stat = os.stat(archive_path)
+            fingerprint = (stat.st_mtime_ns, stat.st_size)
+            if indexed.get(os.path.abspath(archive_path)) != fingerprint:
+                items.append((archive_path, fingerprint))
+
+        executor = ProcessPoolExecutor(n_jobs) if n_jobs > 1 else None
+        try:
+            paths = [archive_path for archive_path, _ in items]
+            records = (
+                executor.map(archive_records, paths)
+                if executor is not None
+                else map(archive_records, paths)
+            )
+            for (archive_path, fingerprint), (configs, results) in zip(items, records):
+                self._insert_configs(configs)
+                self._insert_results(results)
+                with self.connection:
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO archives VALUES (?, ?, ?)",
+                        (os.path.abspath(archive_path),) + fingerprint,
+                    )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return len(items)
+
+    def _insert_configs(self, records: Iterable[Tuple[Any, ...]]):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO configs VALUES (?, ?, ?, ?, ?)", records
+            )
+
+    def _insert_results(self, records: Iterable[ResultRecord]):
+        with self.connection:
+            for result, confusion, classes in records:
+                for table in ("confusion", "classes"):
+                    self.connection.execute(
+                        "DELETE FROM {} WHERE file = ?".format(table), (result[0],)
+                    )
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    result,
+                )
+                self.connection.executemany(
+                    "INSERT INTO confusion VALUES (?, ?, ?, ?)", confusion
+                )
+                self.connection.executemany(
+                    "INSERT INTO classes VALUES (?, ?, ?, ?)", classes
+                )
+
+    def update(self, results_paths: List[str], n_jobs: int = 1):
+        """Indexes result directories and tar archives of results."""
+        archive_paths = []
+        for results_path in results_paths:
+            if os.path.isdir(results_path):
+                self.update_configs(results_path)
+                self.update_results(results_path, n_jobs)
+            else:
+                archive_paths.append(results_path)
+        self.update_archives(archive_paths, n_jobs)
+
+    def results(self) -> pd.DataFrame:
+        """Indexed results joined with their configurations, sorted by file."""
+        return pd.read_sql_query(
+            """
+            SELECT results.file, dataset, split, classifier,
+                COALESCE(od_name, '') AS od_name, removed, results.conf_hash,
+                correct, total
+            FROM results LEFT JOIN configs
+                ON results.conf_hash = configs.conf_hash
+            ORDER BY results.file
+            """,
+            self.connection,
+        ).astype({"removed": int, "correct": int, "total": int})
+
+    def confusion(self) -> pd.DataFrame:
+        """Non-zero confusion matrix cells of all indexed files."""
+        return pd.read_sql_query(
+            "SELECT file, actual, predicted, count FROM confusion", self.connection
+        ).astype({"actual": int, "predicted": int, "count": int})
+
+    def classes(self) -> pd.DataFrame:
+        """Classes of all indexed files with their labels and AUC."""
+        return pd.read_sql_query(
+            "SELECT file, class, label, auc FROM classes", self.connection
+        ).astype({"class": int, "auc": float})
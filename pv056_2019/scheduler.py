@@ -0,0 +1,218 @@
+import heapq
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from pv056_2019.folds import fold_shape, is_fold_view
+from pv056_2019.manifest import Manifest
+from pv056_2019.pool import STATUS_OK, JobResult, run_pool
+
+DEFAULT_RATE = 1e-6
+
+
+def arff_shape(file_path: str) -> Tuple[int, int]:
+    """Number of data rows and attributes of an ARFF file, without parsing it."""
+    if is_fold_view(file_path):
+        return fold_shape(file_path)
+
+    attributes = 0
+    rows = 0
+    with open(file_path, "rb") as arff_file:
+        for line in arff_file:
+            lower_line = line.strip().lower()
+            if lower_line.startswith(b"@attribute"):
+                attributes += 1
+            elif lower_line.startswith(b"@data"):
+                break
+        for line in arff_file:
+            line = line.strip()
+            if line and not line.startswith(b"%"):
+                rows += 1
+
+    return rows, attributes
+
+
+class RuntimeHistory:
+    """Runtimes of previous runs, as seconds per data cell (rows x attributes).
+
+    The history is kept per key (a classifier or an outlier detector
+    configuration) and persisted as JSON in ``file_path`` when it is set.
+    """
+
+    def __init__(self, file_path: Optional[str] = None):
+        self.file_path = file_path
+        self.totals: Dict[str, Dict[str, float]] = {}
+        if file_path and os.path.exists(file_path):
+            with open(file_path) as history_file:
+                self.totals = json.load(history_file)
+
+    def rate(self, key: str) -> Optional[float]:
+        if key not in self.totals or not self.totals[key]["cells"]:
+            return None
+        return self.totals[key]["seconds"] / self.totals[key]["cells"]
+
+    def default_rate(self) -> float:
+        rates = sorted(rate for rate in map(self.rate, self.totals) if rate is not None)
+        return rates[len(rates) // 2] if rates else DEFAULT_RATE
+
+    def record(self, key: str, cells: int, seconds: float):
+        totals = self.totals.setdefault(key, {"seconds": 0.0, "cells": 0})
+        totals["seconds"] += seconds
+        totals["cells"] += cells
+
+    def save(self):
+        if not self.file_path:
+            return
+        tmp_path = "{}.tmp-{}".format(self.file_path, os.getpid())
+        with open(tmp_path, "w") as history_file:
+            json.dump(self.totals, history_file, indent=4, sort_keys=True)
+        os.replace(tmp_path, self.file_path)
+
+
+def lpt_makespan(costs: Sequence[float], n_workers: int) -> float:
+    """Makespan of dispatching ``costs`` in order to the first free worker."""
+    workers = [0.0] * n_workers
+    for cost in costs:
+        heapq.heappush(workers, heapq.heappop(workers) + cost)
+    return max(workers)
+
+
+class CostScheduler:
+    """Orders tasks longest-expected-first and reports the makespan.
+
+    The expected runtime of a task is the sum over its keys of the rate of
+    the key in the runtime history times the number of cells of the task's
+    dataset. Runtimes of successful results of the tasks update the history.
+    """
+
+    def __init__(self, n_workers: int, history_file: Optional[str] = None):
+        self.n_workers = n_workers
+        self.history = RuntimeHistory(history_file)
+        self.tasks: List[Tuple[Any, List[str], int]] = []
+        self.memory: Dict[int, int] = {}
+        self._cells: Dict[str, int] = {}
+
+    def dataset_cells(self, data_path: str) -> int:
+        if data_path not in self._cells:
+            rows, attributes = arff_shape(data_path)
+            self._cells[data_path] = rows * attributes
+        return self._cells[data_path]
+
+    def add(
+        self,
+        task: Any,
+        keys: List[str],
+        data_path: str,
+        memory_mb: Optional[int] = None,
+    ):
+        if memory_mb is not None:
+            self.memory[len(self.tasks)] = memory_mb
+        self.tasks.append((task, keys, self.dataset_cells(data_path)))
+
+    def expected_cost(self, index: int) -> float:
+        _, keys, cells = self.tasks[index]
+        default_rate = self.history.default_rate()
+        return sum(cells * (self.history.rate(key) or default_rate) for key in keys)
+
+    def ordered(self) -> List[Tuple[int, Any]]:
+        order = sorted(range(len(self.tasks)), key=self.expected_cost, reverse=True)
+        return [(index, self.tasks[index][0]) for index in order]
+
+    def run(
+        self,
+        function: Callable[[Any], List[JobResult]],
+        failed_results: Callable[[Any, str, str], List[JobResult]],
+        retries: int = 0,
+        initializer: Optional[Callable] = None,
+        initargs: Tuple = (),
+        manifest: Optional[Manifest] = None,
+        memory_budget_mb: Optional[int] = None,
+        skipped: int = 0,
+    ):
+        """Runs the tasks in a worker pool, records their results in the
+        runtime history and the manifest and prints a summary. ``skipped``
+        is the number of jobs left out by the caller (e.g. completed ones)."""
+        if not self.tasks:
+            print(
+                "No jobs to run ({} skipped)".format(skipped),
+                file=sys.stderr,
+                flush=True,
+            )
+            return
+
+        ordered = self.ordered()
+        predicted = lpt_makespan(
+            [self.expected_cost(index) for index, _ in ordered], self.n_workers
+        )
+        unknown = {key for _, keys, _ in self.tasks for key in keys} - set(
+            self.history.totals
+        )
+
+        statuses: Counter = Counter()
+        failed: List[JobResult] = []
+        peak_rss = 0
+        start_time = time.time()
+        try:
+            for index, results in run_pool(
+                function,
+                ordered,
+                self.n_workers,
+                failed_results,
+                retries=retries,
+                initializer=initializer,
+                initargs=initargs,
+                memory=self.memory,
+                memory_budget_mb=memory_budget_mb,
+            ):
+                cells = self.tasks[index][2]
+                for result in results:
+                    statuses[result.status] += 1
+                    peak_rss = max(peak_rss, result.peak_rss or 0)
+                    if result.status == STATUS_OK:
+                        self.history.record(result.key, cells, result.runtime)
+                    else:
+                        failed.append(result)
+                    if manifest is not None:
+                        manifest.record(
+                            result.output,
+                            result.inputs_hash,
+                            result.status,
+                            result.runtime,
+                        )
+        finally:
+            self.history.save()
+
+        for result in failed:
+            print(
+                "Failed ({}): {}\n\t{}".format(
+                    result.status,
+                    result.output,
+                    result.stderr_tail.strip().replace("\n", "\n\t"),
+                ),
+                file=sys.stderr,
+            )
+        print(
+            "Jobs: {}, peak RSS: {:.0f} MiB".format(
+                ", ".join(
+                    "{} {}".format(count, status) for status, count in statuses.items()
+                ),
+                peak_rss / 1024,
+            ),
+            file=sys.stderr,
+        )
+        print(
+            "Predicted makespan: {:.1f}s{}, actual makespan: {:.1f}s".format(
+                predicted,
+                (
+                    " ({} configurations without history)".format(len(unknown))
+                    if unknown
+                    else ""
+                ),
+                time.time() - start_time,
+            ),
+            file=sys.stderr,
+            flush=True,
+        )
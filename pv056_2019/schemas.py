@@ -1,14 +1,89 @@
-from typing import List, Union
+from typing import Dict, List, Optional, Union
 
 from pydantic import BaseModel, validator
 
+from pv056_2019.arff_reader import ARFF_READERS
 from pv056_2019.outlier_detection import DETECTORS
+from pv056_2019.outlier_detection.neighbors import ALGORITHMS
 
+OD_OUTPUTS = ("arff", "scores")
+SPLIT_OUTPUTS = ("arff", "indices")
+SPLIT_STRATEGIES = ("kfold", "stratified")
+REMOVED_OUTPUTS = ("arff", "mask")
+RESULT_FORMATS = ("csv", "npz")
+# Detectors with a selectable nearest neighbours backend ("algorithm")
+NEIGHBOR_DETECTORS = ("LOF", "NearestNeighbors", "KDN")
 
-class SplitterSchema(BaseModel):
+
+class ArffLoaderSchema(BaseModel):
+    arff_cache_dir: Optional[str] = None
+    arff_reader: str = "liac-arff"
+
+    @validator("arff_reader")
+    def arff_reader_validator(cls, value):
+        if value not in ARFF_READERS:
+            raise ValueError(
+                "ARFF reader {} is not supported. Supported readers are: {}".format(
+                    value, ", ".join(ARFF_READERS)
+                )
+            )
+
+        return value
+
+
+class SplitterSchema(ArffLoaderSchema):
     train_split_dir: str
     test_split_dir: str
     data_path: str
+    n_jobs: int = 1
+    split_output: str = "arff"
+    strategy: str = "kfold"
+    n_splits: int = 5
+    repeats: int = 1
+    seed: int = 42
+
+    @validator("n_jobs")
+    def n_jobs_validator(cls, value):
+        if value < 1:
+            raise ValueError("n_jobs must be greater than 0")
+
+        return value
+
+    @validator("split_output")
+    def split_output_validator(cls, value):
+        if value not in SPLIT_OUTPUTS:
+            raise ValueError(
+                "Split output {} is not supported. Supported outputs are: {}".format(
+                    value, ", ".join(SPLIT_OUTPUTS)
+                )
+            )
+
+        return value
+
+    @validator("strategy")
+    def strategy_validator(cls, value):
+        if value not in SPLIT_STRATEGIES:
+            raise ValueError(
+                "Split strategy {} is not supported. Supported strategies are: {}".format(
+                    value, ", ".join(SPLIT_STRATEGIES)
+                )
+            )
+
+        return value
+
+    @validator("n_splits")
+    def n_splits_validator(cls, value):
+        if value < 2:
+            raise ValueError("n_splits must be at least 2")
+
+        return value
+
+    @validator("repeats")
+    def repeats_validator(cls, value):
+        if value < 1:
+            raise ValueError("repeats must be greater than 0")
+
+        return value
 
 
 class OutlierDetectorSchema(BaseModel):
@@ -26,12 +101,29 @@ class OutlierDetectorSchema(BaseModel):
 
         return value
 
+    @validator("parameters")
+    def parameters_validator(cls, value, values):
+        algorithm = value.get("algorithm", "auto")
+        if values.get("name") in NEIGHBOR_DETECTORS and algorithm not in ALGORITHMS:
+            raise ValueError(
+                "Algorithm {} is not supported. Supported algorithms are: {}".format(
+                    algorithm, ", ".join(ALGORITHMS)
+                )
+            )
+
+        return value
+
 
-class ODStepConfigSchema(BaseModel):
+class ODStepConfigSchema(ArffLoaderSchema):
     train_split_dir: str
     od_methods: List[OutlierDetectorSchema]
     train_od_dir: str
     n_jobs: int = 1
+    group_methods: bool = False
+    od_output: str = "arff"
+    binarized_cache_dir: Optional[str] = None
+    runtime_history: Optional[str] = None
+    retries: int = 0
 
     @validator("n_jobs")
     def n_jobs_validator(cls, value):
@@ -40,20 +132,60 @@ class ODStepConfigSchema(BaseModel):
 
         return value
 
+    @validator("retries")
+    def retries_validator(cls, value):
+        if value < 0:
+            raise ValueError("retries must not be negative")
 
-class RemoveOutliersConfigSchema(BaseModel):
+        return value
+
+    @validator("od_output")
+    def od_output_validator(cls, value):
+        if value not in OD_OUTPUTS:
+            raise ValueError(
+                "OD output {} is not supported. Supported outputs are: {}".format(
+                    value, ", ".join(OD_OUTPUTS)
+                )
+            )
+
+        return value
+
+
+class RemoveOutliersConfigSchema(ArffLoaderSchema):
     test_split_dir: str
     train_od_dir: str
     percentage: Union[int, List[int]]
     train_removed_dir: str
+    train_split_dir: Optional[str] = None
+    n_jobs: int = 1
+    removed_output: str = "arff"
 
     @validator("percentage")
     def percentage_validator(cls, value):
-        if value >= 100 or value < 0:
+        percentages = value if isinstance(value, list) else [value]
+        if any(x >= 100 or x < 0 for x in percentages):
             raise ValueError("Percentage of removed outliers must be between 0 and 100")
 
         return value
 
+    @validator("n_jobs")
+    def n_jobs_validator(cls, value):
+        if value < 1:
+            raise ValueError("n_jobs must be greater than 0")
+
+        return value
+
+    @validator("removed_output")
+    def removed_output_validator(cls, value):
+        if value not in REMOVED_OUTPUTS:
+            raise ValueError(
+                "Removed output {} is not supported. Supported outputs are: {}".format(
+                    value, ", ".join(REMOVED_OUTPUTS)
+                )
+            )
+
+        return value
+
 
 class FilterSchema(BaseModel):
     name: str
@@ -70,11 +202,34 @@ class ClassifierSchema(BaseModel):
         return self.class_name.split(".")[-1]
 
 
+class HeapSchema(BaseModel):
+    min_mb: int = 256
+    max_mb: int = 8192
+    mb_per_million_cells: float = 200
+    classifier_factors: Dict[str, float] = {}
+
+    @validator("max_mb")
+    def max_mb_validator(cls, value, values):
+        if "min_mb" in values and value < values["min_mb"]:
+            raise ValueError("max_mb must not be smaller than min_mb")
+
+        return value
+
+
 class RunClassifiersCongfigSchema(BaseModel):
     output_folder: str
     weka_jar_path: str
     classifiers: List[ClassifierSchema]
     n_jobs: int = 1
+    persistent_jvm: bool = False
+    group_jobs: bool = False
+    timeout: Optional[float] = None
+    runtime_history: Optional[str] = None
+    retries: int = 0
+    heap: Optional[HeapSchema] = None
+    memory_budget_mb: Optional[int] = None
+    result_format: str = "csv"
+    prediction_distribution: bool = False
 
     @validator("n_jobs")
     def n_jobs_validator(cls, value):
@@ -82,3 +237,38 @@ class RunClassifiersCongfigSchema(BaseModel):
             raise ValueError("n_jobs must be greater than 0")
 
         return value
+
+    @validator("retries")
+    def retries_validator(cls, value):
+        if value < 0:
+            raise ValueError("retries must not be negative")
+
+        return value
+
+    @validator("timeout")
+    def timeout_validator(cls, value):
+        if value is not None and value <= 0:
+            raise ValueError("timeout must be greater than 0")
+
+        return value
+
+    @validator("memory_budget_mb")
+    def memory_budget_mb_validator(cls, value, values):
+        if value is not None and value <= 0:
+            raise ValueError("memory_budget_mb must be greater than 0")
+        # Idle persistent JVMs keep their heap outside of the budget
+        if value is not None and values.get("persistent_jvm"):
+            raise ValueError("memory_budget_mb cannot be used with persistent_jvm")
+
+        return value
+
+    @validator("result_format")
+    def result_format_validator(cls, value):
+        if value not in RESULT_FORMATS:
+            raise ValueError(
+                "Result format {} is not supported. Supported formats are: {}".format(
+                    value, ", ".join(RESULT_FORMATS)
+                )
+            )
+
+        return value
@@ -1,12 +1,21 @@
 import argparse
-import json
-import os
 import re
 import sys
 
-import numpy as np
 import pandas as pd
 
+from pv056_2019.metrics import METRICS, file_metrics
+from pv056_2019.results_index import ResultsIndex
+
+# Columns which results can be aggregated by
+GROUP_COLUMNS = {
+    "dataset": "Dataset",
+    "classifier": "Classifier",
+    "od": "Outlier detection",
+    "removed": "Removed",
+    "configuration": "Configuration",
+}
+
 
 def compile_reg(s):
     try:
@@ -18,10 +27,14 @@ def compile_reg(s):
 
 def main():
     parser = argparse.ArgumentParser(
-        description="Script for counting basic statistic (Accuracy, )"
+        description="Script for counting basic statistic (Accuracy, F1, AUC, ...)"
     )
     parser.add_argument(
-        "--results-dir", "-r", required=True, help="Directory with results in .csv"
+        "--results-dir",
+        "-r",
+        required=True,
+        nargs="+",
+        help="Directories with results (.csv or .npz) or tar archives of them",
     )
     parser.add_argument(
         "--pattern",
@@ -37,23 +50,59 @@ def main():
         help="Show raw data (without aggregation by dataset split)",
     )
 
-    args = vars(parser.parse_args())
-
-    reg = re.compile(r"removed-0*")
-    files = sorted([x for x in os.listdir(args["results_dir"]) if x.endswith(".csv")])
+    parser.add_argument(
+        "--index",
+        "-i",
+        help="SQLite file with the results index, only new and changed result "
+        "files are read when it exists (by default the index is not kept)",
+    )
+    parser.add_argument(
+        "--n-jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of processes reading result files",
+    )
 
-    config_file_paths = [
-        x for x in os.listdir(args["results_dir"]) if x.endswith(".json")
-    ]
+    parser.add_argument(
+        "--metrics",
+        "-m",
+        nargs="+",
+        choices=list(METRICS),
+        default=["accuracy"],
+        metavar="METRIC",
+        help="Computed metrics: {} (default: accuracy)".format(", ".join(METRICS)),
+    )
+    parser.add_argument(
+        "--group-by",
+        "-g",
+        nargs="+",
+        choices=list(GROUP_COLUMNS),
+        default=list(GROUP_COLUMNS),
+        metavar="COLUMN",
+        help="Columns the splits are aggregated by: {} (default: all of "
+        "them)".format(", ".join(GROUP_COLUMNS)),
+    )
 
-    config_dict = {}
-    for config_file_path in config_file_paths:
-        with open(os.path.join(args["results_dir"], config_file_path)) as config_file:
-            basename = os.path.basename(config_file_path)
+    args = vars(parser.parse_args())
 
-            conf_hash = basename.split("_")[1].replace(".json", "")
+    results_index = ResultsIndex(args["index"])
+    try:
+        results_index.update(args["results_dir"], args["n_jobs"])
+        results = results_index.results()
+        if set(args["metrics"]) - {"accuracy"}:
+            metrics = file_metrics(
+                results_index.confusion(), results_index.classes(), args["metrics"]
+            )
+        else:
+            metrics = pd.DataFrame(index=pd.Index([], name="file"))
+    finally:
+        results_index.close()
 
-            config_dict[conf_hash] = json.load(config_file)
+    matching = results["file"].map(lambda fl: bool(args["pattern"].match(fl)))
+    results = results[matching.astype(bool)]
+    metrics = metrics.reindex(results["file"])
+    metrics.index = results.index
 
     headers = [
         "Dataset",
@@ -62,43 +111,48 @@ def main():
         "Outlier detection",
         "Removed",
         "Configuration",
-        "Accuracy",
     ]
-    data = []
-    for fl in files:
-        if not args["pattern"].match(fl):
-            continue
-
-        file_split = fl.split("_")
-        file_split[-1] = file_split[-1].replace(".csv", "")
-
-        if "removed-" in file_split[-1]:
-            file_split[-1] = reg.sub("", file_split[-1])
+    data = pd.DataFrame(
+        {
+            "Dataset": results["dataset"],
+            "Split": results["split"],
+            "Classifier": results["classifier"],
+            "Outlier detection": results["od_name"],
+            "Removed": results["removed"],
+            "Configuration": results["conf_hash"],
+        },
+        columns=headers,
+    )
+    for metric in args["metrics"]:
+        if metric == "accuracy":
+            data[METRICS[metric]] = results["correct"] / results["total"]
+        elif metric in ("recall", "confusion"):
+            prefix = METRICS[metric] + " "
+            for column in sorted(metrics.columns):
+                if column.startswith(prefix):
+                    data[column] = metrics[column]
         else:
-            file_split.append(0)
-
-        datest, split, classifier, conf_hash, removed = file_split
-
-        classifier = config_dict[conf_hash]["model_config"].get("class_name")
-
-        od_name = config_dict[conf_hash]["ad_config"].get("name", "")
-
-        dataframe = pd.read_csv(os.path.join(args["results_dir"], fl))
-        all_results = dataframe.shape[0]
-        accuracy = np.sum(dataframe["error"] != "+") / all_results
-
-        data.append([datest, split, classifier, od_name, removed, conf_hash, accuracy])
+            data[METRICS[metric]] = metrics[METRICS[metric]]
 
     if not args["raw"]:
-        dataframe = pd.DataFrame(data, columns=headers)
-        aggregated_frame = dataframe.groupby(
-            ["Dataset", "Classifier", "Outlier detection", "Removed", "Configuration"]
-        ).mean()
-        aggregated_frame = aggregated_frame.loc[:, aggregated_frame.columns != "Split"]
+        # Split is "<fold>" or "<repeat>-<fold>", all of them are averaged,
+        # confusion counts are summed
+        group_by = [GROUP_COLUMNS[column] for column in args["group_by"]]
+        values = [column for column in data.columns if column not in headers]
+        counts = [
+            column for column in values if column.startswith(METRICS["confusion"] + " ")
+        ]
+        grouped = data.groupby(group_by)
+        aggregated_frame = pd.concat(
+            [
+                grouped[[column for column in values if column not in counts]].mean(),
+                grouped[counts].sum(min_count=1).astype("Int64"),
+            ],
+            axis=1,
+        )[values]
         print(aggregated_frame.to_csv())
     else:
-        dataframe = pd.DataFrame(data, columns=headers)
-        print(dataframe.to_csv(index=False, header=False))
+        print(data.to_csv(index=False, header=False))
 
 
 if __name__ == "__main__":
@@ -4,6 +4,8 @@
 
 ID_NAME = "ID"
 OD_VALUE_NAME = "OD_VALUE"
+OD_SCORES_SUFFIX = "_train.npz"
+REMOVED_MASK_SUFFIX = "_train.mask.npy"
 
 # *********************************************************
 # Other utils
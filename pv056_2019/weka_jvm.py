@@ -0,0 +1,125 @@
+import os
+import select
+import subprocess
+import sys
+import tempfile
+from hashlib import md5
+from typing import Any, List, Optional
+
+WORKER_CLASS = "WekaWorker"
+WORKER_SOURCE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "java", WORKER_CLASS + ".java"
+)
+FILTERED_CLASSIFIER = "weka.classifiers.meta.FilteredClassifier"
+
+
+class JVMError(Exception):
+    pass
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def compile_weka_worker(weka_jar_path: str) -> Optional[str]:
+    """Compiles the Java driver of persistent JVMs against the given weka.jar.
+
+    Returns the directory with the compiled class, or None (with a warning)
+    when it can not be compiled, e.g. because ``javac`` is not installed.
+    """
+    with open(WORKER_SOURCE, "rb") as source_file:
+        source_hash = md5(source_file.read())
+    source_hash.update(os.path.abspath(weka_jar_path).encode("UTF-8"))
+
+    class_dir = os.path.join(
+        tempfile.gettempdir(), "pv056_2019-java-" + source_hash.hexdigest()
+    )
+    if os.path.exists(os.path.join(class_dir, WORKER_CLASS + ".class")):
+        return class_dir
+
+    os.makedirs(class_dir, exist_ok=True)
+    try:
+        subprocess.run(
+            ["javac", "-cp", weka_jar_path, "-d", class_dir, WORKER_SOURCE],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+    except (OSError, subprocess.CalledProcessError) as exc:
+        print(
+            "Warning: persistent JVM is not available, falling back to a JVM per run:",
+            exc,
+            file=sys.stderr,
+            flush=True,
+        )
+        return None
+
+    return class_dir
+
+
+class PersistentJVM:
+    """One long-lived JVM running FilteredClassifier jobs sent over its stdin.
+
+    Jobs are the argument lists built by ``ClassifierManager``, the JVM
+    options in front of the FilteredClassifier class are used to start the
+    JVM (it is restarted when they change), the options after it are sent
+    to the ``WekaWorker`` driver.
+    """
+
+    def __init__(self, class_dir: str):
+        self.class_dir = class_dir
+        self._process: Any = None
+        self._jvm_args: List[str] = []
+
+    def _start(self, jvm_args: List[str]):
+        self.close()
+
+        command = list(jvm_args)
+        cp_index = command.index("-cp") + 1
+        command[cp_index] = command[cp_index] + os.pathsep + self.class_dir
+        command.append(WORKER_CLASS)
+
+        try:
+            self._process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as exc:
+            raise JVMError(exc)
+        self._jvm_args = jvm_args
+
+    def run(self, args: List[str], timeout: Optional[float] = None):
+        split_index = args.index(FILTERED_CLASSIFIER)
+        jvm_args, options = args[:split_index], args[split_index + 1 :]
+        if any("\t" in option or "\n" in option for option in options):
+            raise JVMError("Options with tabs or new lines can not be sent")
+
+        if self._process is None or jvm_args != self._jvm_args:
+            self._start(jvm_args)
+
+        try:
+            self._process.stdin.write(("\t".join(options) + "\n").encode("UTF-8"))
+            self._process.stdin.flush()
+        except OSError as exc:
+            self.close()
+            raise JVMError(exc)
+
+        ready, _, _ = select.select([self._process.stdout], [], [], timeout)
+        if not ready:
+            self.close()
+            raise JobTimeout("Timed out after {}s".format(timeout))
+
+        status = self._process.stdout.readline().decode("UTF-8").rstrip("\n")
+        if not status:
+            self.close()
+            raise JVMError("JVM exited unexpectedly")
+        if status != "OK":
+            raise RuntimeError(status.split("\t", 1)[-1])
+
+    def close(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
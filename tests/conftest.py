@@ -0,0 +1,73 @@
+import pytest
+
+# Numeric, integer, nominal and string attributes with missing values,
+# quoted values and spaces around them
+ARFF = """% Test dataset
+@RELATION my_data
+
+@ATTRIBUTE num NUMERIC
+@ATTRIBUTE real REAL
+@ATTRIBUTE int INTEGER
+@ATTRIBUTE nom {a, 'b c', d}
+@ATTRIBUTE txt STRING
+@ATTRIBUTE class {yes,no}
+
+@DATA
+1.5,0.1,3,a,hello,yes
+?,-2e-05,4,'b c','two words',no
+3,1e20,?,?,?,yes
+-0.0,7,0,d,'x, y',no
+0.30000000000000004, 2 ,5, a ,x,yes
+"""
+
+
+@pytest.fixture
+def arff_path(tmp_path):
+    path = tmp_path / "my_data.arff"
+    path.write_text(ARFF)
+    return str(path)
+
+
+def weka_value(index, labels):
+    return "?" if index < 0 else "{}:{}".format(index + 1, labels[index])
+
+
+@pytest.fixture
+def write_predictions(tmp_path):
+    """Writes a prediction CSV as Weka does (``-p first``), with the class
+    distribution when it is given. Missing classes are -1."""
+
+    def write(file_name, labels, actual, predicted, distribution=None):
+        header = ["inst#", "actual", "predicted", "error"]
+        if distribution is None:
+            header += ["prediction"]
+        else:
+            header += ["distribution"] + [""] * (len(labels) - 1)
+        lines = [",".join(header + ["ID"])]
+        for row, (actual_class, predicted_class) in enumerate(zip(actual, predicted)):
+            error = "+" if 0 <= actual_class != predicted_class else ""
+            if distribution is None:
+                prediction = ["1"]
+            else:
+                prediction = [
+                    ("*" if index == predicted_class else "") + repr(float(value))
+                    for index, value in enumerate(distribution[row])
+                ]
+            lines.append(
+                ",".join(
+                    [
+                        str(row + 1),
+                        weka_value(actual_class, labels),
+                        weka_value(predicted_class, labels),
+                        error,
+                    ]
+                    + prediction
+                    + [str(row + 1)]
+                )
+            )
+
+        path = tmp_path / file_name
+        path.write_text("\n".join(lines) + "\n")
+        return str(path)
+
+    return write
@@ -0,0 +1,49 @@
+import os
+
+import arff
+import pandas as pd
+import pytest
+
+from pv056_2019.arff_cache import ArffCache
+from pv056_2019.data_loader import DataLoader
+
+
+def load(file_path, cache_dir):
+    return DataLoader._load_arff_file(file_path, cache_dir=cache_dir)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "cache")
+
+
+def test_cache_hit(monkeypatch, arff_path, cache_dir):
+    parsed = load(arff_path, None)
+    stored = load(arff_path, cache_dir)
+    assert ArffCache(cache_dir).load(arff_path) is not None
+
+    def parse(*args, **kwargs):
+        raise AssertionError("cached file parsed again")
+
+    monkeypatch.setattr(arff, "load", parse)
+    cached = load(arff_path, cache_dir)
+
+    for frame in (stored, cached):
+        pd.testing.assert_frame_equal(pd.DataFrame(frame), pd.DataFrame(parsed))
+        assert frame._arff_data == parsed._arff_data
+        assert frame.arff_dumps() == parsed.arff_dumps()
+
+
+def test_cache_miss_on_changed_file(arff_path, cache_dir):
+    load(arff_path, cache_dir)
+
+    with open(arff_path, "a") as arff_file:
+        arff_file.write("4,5,6,d,new,no\n")
+    assert ArffCache(cache_dir).load(arff_path) is None
+    assert load(arff_path, cache_dir)["txt"].tolist()[-1] == "new"
+    assert ArffCache(cache_dir).load(arff_path) is not None
+
+    # Same size, other modification time
+    stat = os.stat(arff_path)
+    os.utime(arff_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert ArffCache(cache_dir).load(arff_path) is None
@@ -0,0 +1,117 @@
+import math
+
+import arff
+import numpy as np
+import pandas as pd
+import pytest
+
+from pv056_2019.arff_reader import load_arff, load_arff_classes
+from pv056_2019.data_loader import DataLoader
+
+SPARSE_ARFF = """@RELATION sparse
+
+@ATTRIBUTE num NUMERIC
+@ATTRIBUTE int INTEGER
+@ATTRIBUTE nom {a,b}
+@ATTRIBUTE class {x,y}
+
+@DATA
+{0 1.5,2 b}
+{1 3,3 y}
+% comment
+{}
+{0 ?,3 y}
+"""
+
+QUOTED_ARFF = """@RELATION quoted
+
+@ATTRIBUTE txt STRING
+@ATTRIBUTE class {x,y}
+
+@DATA
+"double quoted",x
+'it\\'s',y
+"""
+
+
+def normalized(value):
+    """Value as liac-arff and the native reader should both give it."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    return value
+
+
+def rows(data):
+    if isinstance(data, pd.DataFrame):
+        data = data.values.tolist()
+    return [[normalized(value) for value in row] for row in data]
+
+
+def assert_same_as_liac(file_path):
+    native = load_arff(file_path)
+    with open(file_path) as arff_file:
+        liac = arff.load(arff_file)
+
+    assert {key: value for key, value in native.items() if key != "data"} == {
+        key: value for key, value in liac.items() if key != "data"
+    }
+    assert rows(native["data"]) == rows(liac["data"])
+    return native
+
+
+@pytest.fixture
+def write_arff(tmp_path):
+    def write(name, content):
+        path = tmp_path / name
+        path.write_text(content)
+        return str(path)
+
+    return write
+
+
+def test_dense(arff_path):
+    data = assert_same_as_liac(arff_path)["data"]
+    # Types from the header
+    assert data["num"].dtype == np.float64
+    assert data["real"].dtype == np.float64
+    assert data["int"].dtype == np.float64
+    assert data["nom"].dtype == object
+    assert data["nom"].tolist()[:2] == ["a", "b c"]
+
+
+def test_integer_without_missing_values(write_arff):
+    file_path = write_arff(
+        "int.arff", "@RELATION int\n@ATTRIBUTE int INTEGER\n@DATA\n1\n-2\n3\n"
+    )
+    assert assert_same_as_liac(file_path)["data"]["int"].dtype == np.int64
+
+
+def test_sparse(write_arff):
+    assert_same_as_liac(write_arff("sparse.arff", SPARSE_ARFF))
+
+
+def test_quoted(write_arff):
+    # Double quotes and escapes are left to liac-arff
+    assert_same_as_liac(write_arff("quoted.arff", QUOTED_ARFF))
+
+
+def test_bad_nominal_value(write_arff):
+    file_path = write_arff(
+        "bad.arff", "@RELATION bad\n@ATTRIBUTE nom {a,b}\n@DATA\na\nc\n"
+    )
+    with pytest.raises(arff.BadNominalValue):
+        load_arff(file_path)
+
+
+def test_data_loader(arff_path):
+    native = DataLoader._load_arff_file(arff_path, reader="native")
+    liac = DataLoader._load_arff_file(arff_path)
+    assert native._arff_data == liac._arff_data
+    assert rows(native) == rows(liac)
+
+
+def test_load_arff_classes(arff_path, write_arff):
+    assert load_arff_classes(arff_path).tolist() == ["yes", "no", "yes", "no", "yes"]
+    assert load_arff_classes(write_arff("sparse.arff", SPARSE_ARFF)) is None
@@ -0,0 +1,50 @@
+import io
+
+import arff
+import numpy as np
+import pytest
+
+from pv056_2019.arff_writer import dump_arff, dump_arff_rows, encode_rows
+from pv056_2019.data_loader import DataFrameArff, DataLoader
+
+
+@pytest.fixture(params=["liac-arff", "native"])
+def dataframe(request, arff_path):
+    return DataLoader._load_arff_file(arff_path, reader=request.param)
+
+
+def liac_dumps(dataframe):
+    """Output of arff_dump before the streaming writer."""
+    return arff.dumps(dataframe.arff_data())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 10000])
+def test_dump_arff(dataframe, chunk_size):
+    output = io.StringIO()
+    dump_arff(dataframe, dataframe._arff_data, output, chunk_size)
+    assert output.getvalue() == liac_dumps(dataframe)
+    assert dataframe.arff_dumps() == liac_dumps(dataframe)
+
+
+def test_dump_arff_rows(dataframe):
+    lines = encode_rows(dataframe, chunk_size=2)
+    mask = np.array([True, False, True, True, False])
+
+    output = io.StringIO()
+    dump_arff_rows(lines[mask], dataframe._arff_data, output, chunk_size=2)
+    assert output.getvalue() == liac_dumps(dataframe.select_by_index(mask))
+
+
+def test_dump_empty(dataframe):
+    # liac-arff can not write a file without rows, only the header is written
+    empty = dataframe.select_by_index(np.zeros(len(dataframe), dtype=bool))
+    header, _ = liac_dumps(dataframe).split("@DATA\n")
+    assert empty.arff_dumps() == header + "@DATA\n"
+
+
+def test_read_written(tmp_path, dataframe):
+    file_path = str(tmp_path / "written.arff")
+    dataframe.arff_dump(file_path)
+    with open(file_path) as arff_file:
+        written = DataFrameArff(arff_data=arff.load(arff_file))
+    assert written.arff_dumps() == liac_dumps(dataframe)
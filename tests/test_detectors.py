@@ -0,0 +1,224 @@
+import numpy as np
+import pytest
+from sklearn.neighbors import NearestNeighbors
+from sklearn.tree import DecisionTreeClassifier
+
+from pv056_2019.data_loader import DataFrameArff
+from pv056_2019.outlier_detection import DETECTORS
+from pv056_2019.outlier_detection.DCP import DCPMetric
+
+# Per-row implementations the vectorized detectors replaced
+
+
+def loop_kdn(df, classes, k):
+    values = np.empty([0, 0])
+
+    estimator = NearestNeighbors(n_neighbors=k)
+    estimator.fit(df.values)
+    _, indices = estimator.kneighbors()
+    for index, neighbors in enumerate(indices):
+        value = 0.0
+        for neighbor in neighbors:
+            if classes[index] != classes[neighbor]:
+                value += 1.0
+        values = np.append(values, np.full((1, 1), value / k))
+    return values
+
+
+def loop_ds(df, classes):
+    values = np.empty([0, 0])
+
+    estimator = DecisionTreeClassifier()
+    estimator.fit(df, classes)
+    leafsIndexes = estimator.apply(df, check_input=True)
+    leafs = np.zeros(estimator.tree_.node_count)
+    for leafIndex in leafsIndexes:
+        leafs[leafIndex] += 1
+
+    biggestDisjunct = max(leafs) - 1
+    for leafIndex in leafsIndexes:
+        values = np.append(
+            values, np.full((1, 1), ((leafs[leafIndex] - 1) / biggestDisjunct) * -1)
+        )
+
+    return values
+
+
+def loop_td(df, classes, **tree_settings):
+    values = np.empty([0, 0])
+
+    estimator = DecisionTreeClassifier(**tree_settings)
+    estimator.fit(df, classes)
+
+    n_nodes = estimator.tree_.node_count
+    children_left = estimator.tree_.children_left
+    children_right = estimator.tree_.children_right
+
+    node_depth = np.zeros(shape=n_nodes, dtype=np.int64)
+
+    stack = [(0, -1)]
+    while len(stack) > 0:
+        node_id, parent_depth = stack.pop()
+        node_depth[node_id] = parent_depth + 1
+
+        if children_left[node_id] != children_right[node_id]:
+            stack.append((children_left[node_id], parent_depth + 1))
+            stack.append((children_right[node_id], parent_depth + 1))
+
+    leafsIndexes = estimator.apply(df, check_input=True)
+    for index in leafsIndexes:
+        values = np.append(values, np.full((1, 1), node_depth[index]))
+
+    return values
+
+
+def loop_dcp(estimator, df, classes):
+    values = np.empty([0, 0])
+
+    leafsIndexes = estimator.apply(df, check_input=True)
+
+    for index, _ in df.iterrows():
+        suma = 0
+        value = 0
+        for leafIndex, _ in df.iterrows():
+            if leafsIndexes[index] == leafsIndexes[leafIndex]:
+                suma += 1
+                if classes[index] == classes[leafIndex]:
+                    value += 1
+        values = np.append(values, np.full((1, 1), (value / suma) * -1))
+
+    return values
+
+
+def loop_mv(classes):
+    classes_list, counts = np.unique(classes, return_counts=True)
+    majority_class_count = counts.max()
+    class_sizes = dict(zip(classes_list, counts))
+    values = np.empty([0])
+
+    for cl in classes:
+        values = np.append(values, class_sizes[cl] / majority_class_count)
+
+    return values
+
+
+def loop_cb(classes):
+    classes_list, counts = np.unique(classes, return_counts=True)
+    class_sizes = dict(zip(classes_list, counts))
+    classes_count = len(classes_list)
+    samples_count = len(classes)
+    values = np.empty([0])
+
+    for cl in classes:
+        value = (class_sizes[cl] / samples_count) - (1 / classes_count)
+        values = np.append(values, value)
+
+    return values
+
+
+@pytest.fixture
+def dataframe():
+    random = np.random.RandomState(0)
+    data = []
+    for _ in range(200):
+        value = round(float(random.rand()), 3)
+        nominal = str(random.choice(["a", "b", "c"]))
+        label = (
+            "x" if value + random.rand() / 2 > 0.8 else str(random.choice(["y", "z"]))
+        )
+        data.append([value, nominal, int(random.randint(0, 5)), label])
+    return DataFrameArff(
+        arff_data={
+            "relation": "mixed",
+            "attributes": [
+                ("numeric", "NUMERIC"),
+                ("nominal", ["a", "b", "c"]),
+                ("integer", "INTEGER"),
+                ("class", ["x", "y", "z"]),
+            ],
+            "data": data,
+        }
+    )
+
+
+def compute_scores(name, dataframe, **settings):
+    detector = DETECTORS[name](**settings)
+    return detector.compute_scores(dataframe, dataframe[dataframe.columns[-1]]).values
+
+
+@pytest.mark.parametrize("k", [1, 5])
+def test_kdn(dataframe, k):
+    classes = dataframe[dataframe.columns[-1]]
+    expected = loop_kdn(dataframe._binarize_categorical_values(), classes, k)
+    np.testing.assert_allclose(
+        compute_scores("KDN", dataframe, n_neighbors=str(k)), expected
+    )
+
+
+def test_ds(dataframe):
+    classes = dataframe[dataframe.columns[-1]]
+    # Both fit a tree with the global random state
+    np.random.seed(0)
+    expected = loop_ds(dataframe._binarize_categorical_values(), classes)
+    np.random.seed(0)
+    np.testing.assert_allclose(compute_scores("DS", dataframe), expected)
+
+
+def test_td(dataframe):
+    classes = dataframe[dataframe.columns[-1]]
+    np.random.seed(0)
+    expected = loop_td(dataframe._binarize_categorical_values(), classes)
+    np.random.seed(0)
+    np.testing.assert_allclose(compute_scores("TD", dataframe), expected)
+
+
+@pytest.mark.skipif(
+    "min_impurity_split" not in DecisionTreeClassifier().get_params(),
+    reason="scikit-learn without min_impurity_split",
+)
+def test_td_with_prunning(dataframe):
+    classes = dataframe[dataframe.columns[-1]]
+    np.random.seed(0)
+    expected = loop_td(
+        dataframe._binarize_categorical_values(), classes, min_impurity_split=0.3
+    )
+    np.random.seed(0)
+    np.testing.assert_allclose(
+        compute_scores("TDWithPrunning", dataframe, min_impurity_split="0.3"), expected
+    )
+
+
+@pytest.mark.parametrize("max_depth", [None, 3])
+def test_dcp_fractions(dataframe, max_depth):
+    # Any tree, sklearn without min_impurity_split cannot build the DCP one
+    bin_dataframe = dataframe._binarize_categorical_values()
+    classes = dataframe[dataframe.columns[-1]]
+    estimator = DecisionTreeClassifier(max_depth=max_depth, random_state=0)
+    estimator.fit(bin_dataframe, classes)
+    np.testing.assert_allclose(
+        DCPMetric.sameClassFractions(estimator, bin_dataframe, classes),
+        loop_dcp(estimator, bin_dataframe, classes),
+    )
+
+
+@pytest.mark.skipif(
+    "min_impurity_split" not in DecisionTreeClassifier().get_params(),
+    reason="scikit-learn without min_impurity_split",
+)
+def test_dcp(dataframe):
+    bin_dataframe = dataframe._binarize_categorical_values()
+    classes = dataframe[dataframe.columns[-1]]
+    np.random.seed(0)
+    estimator = DecisionTreeClassifier(min_impurity_split=0.3)
+    estimator.fit(bin_dataframe, classes)
+    expected = loop_dcp(estimator, bin_dataframe, classes)
+    np.random.seed(0)
+    np.testing.assert_allclose(
+        compute_scores("DCP", dataframe, min_impurity_split="0.3"), expected
+    )
+
+
+@pytest.mark.parametrize("name, loop", [("MV", loop_mv), ("CB", loop_cb)])
+def test_class_frequencies(dataframe, name, loop):
+    classes = dataframe[dataframe.columns[-1]]
+    np.testing.assert_allclose(compute_scores(name, dataframe), loop(classes))
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from sklearn.neighbors import LocalOutlierFactor, NearestNeighbors
+
+from pv056_2019.outlier_detection.LOF import LOFMetric
+from pv056_2019.outlier_detection.neighbors import kneighbors
+
+
+@pytest.fixture
+def values():
+    random = np.random.RandomState(0)
+    centers = random.rand(4, 8) * 10
+    clusters = centers[random.randint(0, 4, 300)] + random.randn(300, 8)
+    return np.vstack([clusters, random.rand(15, 8) * 14 - 2])
+
+
+def training_scores(values, **settings):
+    # Scores of the training instances as the LOF detector computes them
+    estimator = LocalOutlierFactor(novelty=True, **settings)
+    return estimator.fit(values).decision_function(values)
+
+
+def ranks(scores):
+    return np.argsort(np.argsort(scores))
+
+
+@pytest.mark.parametrize("settings", [{}, {"contamination": 0.2}, {"n_neighbors": 5}])
+def test_exact_neighbors(values, settings):
+    np.testing.assert_allclose(
+        LOFMetric().countLOF(values, algorithm="brute", **settings),
+        training_scores(values, **settings),
+        rtol=1e-10,
+    )
+
+
+def test_legacy_contamination(values):
+    # sklearn 0.20 "legacy" is a contamination of 0.1
+    np.testing.assert_allclose(
+        LOFMetric().countLOF(values, algorithm="brute", contamination="legacy"),
+        training_scores(values, contamination=0.1),
+        rtol=1e-10,
+    )
+
+
+@pytest.mark.parametrize(
+    "contamination, exact_contamination", [("auto", "auto"), ("0.2", 0.2)]
+)
+def test_approximate_neighbors(values, contamination, exact_contamination):
+    approximate = LOFMetric().countLOF(
+        values, algorithm="approximate", contamination=contamination
+    )
+    exact = training_scores(values, contamination=exact_contamination)
+
+    # Same offset, scores differ only where neighbours were missed
+    assert np.median(np.abs(approximate - exact)) < 1e-3
+    assert np.corrcoef(ranks(approximate), ranks(exact))[0, 1] > 0.99
+    outliers = set(np.argsort(exact)[:15])
+    assert len(outliers & set(np.argsort(approximate)[:15])) >= 13
+
+
+def test_approximate_recall():
+    values = np.random.RandomState(0).rand(2000, 20)
+    distances, indices = kneighbors(values, 10, algorithm="approximate")
+    exact_distances, exact_indices = (
+        NearestNeighbors(n_neighbors=10).fit(values).kneighbors()
+    )
+
+    recall = np.mean(
+        [
+            len(set(found) & set(exact)) / 10
+            for found, exact in zip(indices, exact_indices)
+        ]
+    )
+    assert recall >= 0.5
+
+    # Found neighbours have their exact distances, sorted, never closer than
+    # the true ones
+    rows = np.arange(len(values))[:, np.newaxis]
+    np.testing.assert_allclose(
+        distances, np.linalg.norm(values[indices] - values[rows], axis=2)
+    )
+    assert np.all(np.diff(distances, axis=1) >= 0)
+    assert np.all(distances >= exact_distances - 1e-12)
@@ -0,0 +1,105 @@
+import os
+from itertools import product
+
+import numpy as np
+import pytest
+from sklearn.metrics import (
+    balanced_accuracy_score,
+    confusion_matrix,
+    f1_score,
+    recall_score,
+    roc_auc_score,
+)
+from sklearn.preprocessing import label_binarize
+
+from pv056_2019.metrics import class_auc, file_metrics
+from pv056_2019.predictions import condense_predictions
+from pv056_2019.results_index import ResultsIndex
+
+LABELS = ["a", "b", "c", "d"]
+METRICS = ["balanced_accuracy", "macro_f1", "auc", "recall", "confusion"]
+
+
+def random_predictions(seed, n_rows=300):
+    random = np.random.RandomState(seed)
+    actual = random.randint(0, len(LABELS), n_rows)
+    # Mostly right, class "d" is never predicted
+    predicted = np.where(
+        random.rand(n_rows) < 0.6, actual, random.randint(0, len(LABELS), n_rows)
+    )
+    predicted[predicted == 3] = 0
+    distribution = random.rand(n_rows, len(LABELS))
+    distribution[np.arange(n_rows), actual] += random.rand(n_rows)
+    # Ties of the probabilities
+    distribution = np.round(distribution / distribution.sum(axis=1)[:, np.newaxis], 2)
+    return actual, predicted, distribution
+
+
+@pytest.fixture
+def predictions(write_predictions):
+    files = {}
+    for seed in range(3):
+        actual, predicted, distribution = random_predictions(seed)
+        csv_path = write_predictions(
+            "data_{}_J48_aaa.csv".format(seed),
+            LABELS,
+            actual,
+            predicted,
+            distribution,
+        )
+        npz_path = csv_path[: -len(".csv")] + ".npz"
+        condense_predictions(csv_path, npz_path)
+        files[os.path.basename(npz_path)] = (actual, predicted, distribution)
+    return os.path.dirname(npz_path), files
+
+
+def test_class_auc():
+    actual, _, distribution = random_predictions(0)
+    # The probabilities are written by Weka in single precision
+    distribution = distribution.astype(np.float32)
+    np.testing.assert_allclose(
+        class_auc(actual, distribution),
+        [
+            roc_auc_score(actual == index, distribution[:, index])
+            for index in range(len(LABELS))
+        ],
+    )
+
+
+def test_file_metrics(predictions):
+    results_dir, files = predictions
+    index = ResultsIndex()
+    index.update([results_dir])
+    metrics = file_metrics(index.confusion(), index.classes(), METRICS)
+
+    assert sorted(metrics.index) == sorted(files)
+    for file_name, (actual, predicted, distribution) in files.items():
+        row = metrics.loc[file_name]
+        assert row["Balanced accuracy"] == pytest.approx(
+            balanced_accuracy_score(actual, predicted)
+        )
+        assert row["Macro F1"] == pytest.approx(
+            f1_score(actual, predicted, average="macro")
+        )
+        # One-vs-rest AUC averaged over the classes
+        assert row["AUC"] == pytest.approx(
+            roc_auc_score(
+                label_binarize(actual, classes=range(len(LABELS))),
+                distribution.astype(np.float32),
+                average="macro",
+            )
+        )
+
+        recall = recall_score(actual, predicted, average=None)
+        np.testing.assert_allclose(
+            [row["Recall {}".format(label)] for label in LABELS], recall
+        )
+
+        confusion = confusion_matrix(actual, predicted)
+        for (a, actual_label), (p, predicted_label) in product(
+            enumerate(LABELS), repeat=2
+        ):
+            # Cells which are zero in all files have no column
+            column = "Confusion {} -> {}".format(actual_label, predicted_label)
+            count = row[column] if column in row.index else 0
+            assert np.nan_to_num(count) == confusion[a, p]
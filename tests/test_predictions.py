@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import pytest
+
+from pv056_2019.predictions import (
+    MISSING_CLASS,
+    condense_predictions,
+    load_predictions,
+    read_weka_predictions,
+)
+from pv056_2019.results_index import result_record
+
+LABELS = ["a", "b c", "d"]
+ACTUAL = np.array([0, 1, 2, 1, MISSING_CLASS, 0])
+PREDICTED = np.array([0, 2, 2, 1, 1, 1])
+# Rows without the error mark, Weka marks none for a missing class
+CORRECT = (ACTUAL == PREDICTED) | (ACTUAL == MISSING_CLASS)
+
+
+@pytest.fixture(params=[False, True], ids=["prediction", "distribution"])
+def distribution(request):
+    if not request.param:
+        return None
+    random = np.random.RandomState(0)
+    values = random.rand(len(ACTUAL), len(LABELS))
+    values[np.arange(len(ACTUAL)), PREDICTED] += 1
+    return np.round(values / values.sum(axis=1)[:, np.newaxis], 3)
+
+
+@pytest.fixture
+def csv_path(write_predictions, distribution):
+    return write_predictions(
+        "data_0_J48_aaa.csv", LABELS, ACTUAL, PREDICTED, distribution
+    )
+
+
+def test_read_weka_predictions(csv_path, distribution):
+    with open(csv_path, newline="") as csv_file:
+        record = read_weka_predictions(csv_file)
+
+    np.testing.assert_array_equal(record["actual"], ACTUAL)
+    np.testing.assert_array_equal(record["predicted"], PREDICTED)
+    np.testing.assert_array_equal(record["correct"], CORRECT)
+    np.testing.assert_array_equal(record["id"], np.arange(1, len(ACTUAL) + 1))
+    assert record["classes"].tolist() == LABELS
+    if distribution is None:
+        assert "distribution" not in record
+    else:
+        np.testing.assert_allclose(record["distribution"], distribution, rtol=1e-6)
+
+
+def test_condense_predictions(csv_path):
+    with open(csv_path, newline="") as csv_file:
+        record = read_weka_predictions(csv_file)
+
+    npz_path = csv_path[: -len(".csv")] + ".npz"
+    condense_predictions(csv_path, npz_path)
+    assert not os.path.exists(csv_path)
+
+    loaded = load_predictions(npz_path)
+    assert set(loaded) == set(record)
+    for key, values in record.items():
+        np.testing.assert_array_equal(loaded[key], values)
+        assert loaded[key].dtype == values.dtype
+
+    assert set(load_predictions(npz_path, ["actual", "unknown"])) == {"actual"}
+
+
+def test_result_record(csv_path):
+    """The results index gets the same rows from a CSV and its record."""
+    csv_record = result_record(os.path.basename(csv_path), 0, 0, csv_path)
+    npz_path = csv_path[: -len(".csv")] + ".npz"
+    condense_predictions(csv_path, npz_path)
+    npz_record = result_record(os.path.basename(npz_path), 0, 0, npz_path)
+
+    def without_file_names(record):
+        result, confusion, classes = record
+        return (
+            result[3:],
+            [row[1:] for row in confusion],
+            [row[1:] for row in classes],
+        )
+
+    assert without_file_names(npz_record) == without_file_names(csv_record)
+    result, _, _ = csv_record
+    assert result[-2:] == (CORRECT.sum(), len(ACTUAL))
@@ -0,0 +1,101 @@
+import os
+
+import arff
+import numpy as np
+import pytest
+
+from pv056_2019.data_loader import DataFrameArff, DataLoader
+from pv056_2019.remove_outliers import remove_outliers
+from pv056_2019.schemas import RemoveOutliersConfigSchema
+from pv056_2019.utils import ID_NAME, OD_VALUE_NAME
+
+PERCENTAGES = [0, 5, 10, 25, 50, 99]
+
+
+def loop_removed(dataframe, percentage):
+    """ARFF file of one percentage, as written before the single pass."""
+    new_frame = dataframe.select_by_od_quantile(1 - (percentage / 100))
+    new_frame.pop(OD_VALUE_NAME)
+    new_frame._arff_data = dict(new_frame._arff_data)
+    new_frame._arff_data["attributes"] = [
+        x for x in new_frame._arff_data["attributes"] if x[0] != OD_VALUE_NAME
+    ]
+    return arff.dumps(new_frame.arff_data())
+
+
+@pytest.fixture
+def conf(tmp_path):
+    directories = {}
+    for name in ("train_od_dir", "test_split_dir", "train_removed_dir"):
+        directories[name] = str(tmp_path / name)
+        (tmp_path / name).mkdir()
+    return RemoveOutliersConfigSchema(percentage=PERCENTAGES, **directories)
+
+
+@pytest.fixture
+def train_file_path(conf):
+    random = np.random.RandomState(0)
+    # Ties and a missing value among the OD values
+    od_values = np.round(random.rand(40), 1).tolist()
+    od_values[3] = None
+    data = [
+        [index, float(random.rand()), str(random.choice(["a", "b"])), od, "x"]
+        for index, od in enumerate(od_values)
+    ]
+    dataframe = DataFrameArff(
+        arff_data={
+            "relation": "data",
+            "attributes": [
+                (ID_NAME, "INTEGER"),
+                ("value", "NUMERIC"),
+                ("nominal", ["a", "b"]),
+                (OD_VALUE_NAME, "NUMERIC"),
+                ("class", ["x", "y"]),
+            ],
+            "data": data,
+        }
+    )
+    file_path = os.path.join(conf.train_od_dir, "data_0_abc_train.arff")
+    dataframe.arff_dump(file_path)
+    return file_path
+
+
+def read(file_path):
+    with open(file_path) as arff_file:
+        return arff_file.read()
+
+
+def test_removed_files(conf, train_file_path):
+    dataframe = DataLoader._load_arff_file(train_file_path)
+    datasets = remove_outliers(conf, train_file_path)
+
+    assert len(datasets) == len(PERCENTAGES)
+    for percentage, (file_path, test_path, od_config_path) in zip(
+        PERCENTAGES, datasets
+    ):
+        assert file_path.endswith(
+            "data_0_abc_removed-{:03d}_train.arff".format(percentage)
+        )
+        assert test_path == os.path.join(conf.test_split_dir, "data_0_test.arff")
+        assert od_config_path == os.path.join(conf.train_od_dir, "abc.json")
+        assert read(file_path) == loop_removed(dataframe, percentage)
+
+
+def test_removed_masks(conf, train_file_path):
+    dataframe = DataLoader._load_arff_file(train_file_path)
+    conf.removed_output = "mask"
+    datasets = remove_outliers(conf, train_file_path)
+
+    sorted_path = datasets[0][0]
+    header, data = read(sorted_path).split("@DATA\n")
+    lines = np.array(data.splitlines())
+    for percentage, (file_path, _, _, mask_path) in zip(PERCENTAGES, datasets):
+        assert file_path == sorted_path
+        expected_header, expected_data = loop_removed(dataframe, percentage).split(
+            "@DATA\n"
+        )
+        # Rows are sorted by their OD values, the removed ones are at the end
+        mask = np.load(mask_path)
+        assert mask[: mask.sum()].all()
+        assert header == expected_header
+        assert sorted(lines[mask]) == sorted(expected_data.splitlines())
@@ -0,0 +1,72 @@
+import json
+import sys
+
+import pytest
+
+from pv056_2019 import statistics
+
+HEADER = "Dataset,Classifier,Outlier detection,Removed,Configuration,Accuracy"
+
+
+def run_statistics(monkeypatch, capsys, *args):
+    monkeypatch.setattr(sys, "argv", ["pv056-statistics"] + list(args))
+    statistics.main()
+    return capsys.readouterr().out.strip().splitlines()
+
+
+@pytest.fixture
+def results_dir(tmp_path):
+    with open(str(tmp_path / "J48_aaa.json"), "w") as config_file:
+        json.dump(
+            {"model_config": {"class_name": "weka.J48"}, "ad_config": {}}, config_file
+        )
+    for split in range(2):
+        with open(str(tmp_path / "iris_{}_J48_aaa.csv".format(split)), "w") as csv_file:
+            csv_file.write(
+                "inst#,actual,predicted,error,prediction,ID\n"
+                "1,1:a,1:a,,1,1\n"
+                "2,2:b,1:a,+,1,2\n"
+            )
+    return tmp_path
+
+
+def test_results(monkeypatch, capsys, results_dir):
+    assert run_statistics(monkeypatch, capsys, "-r", str(results_dir)) == [
+        HEADER,
+        "iris,weka.J48,,0,aaa,0.5",
+    ]
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        [],
+        ["--raw"],
+        [
+            "-m",
+            "accuracy",
+            "balanced_accuracy",
+            "macro_f1",
+            "auc",
+            "recall",
+            "confusion",
+        ],
+    ],
+)
+def test_empty_results(monkeypatch, capsys, tmp_path, args):
+    lines = run_statistics(monkeypatch, capsys, "-r", str(tmp_path), *args)
+    if "--raw" in args:
+        assert lines == []
+    else:
+        assert lines[0].startswith(HEADER) and len(lines) == 1
+
+
+@pytest.mark.parametrize("args", [[], ["--raw"], ["-m", "accuracy", "confusion"]])
+def test_filtered_results(monkeypatch, capsys, results_dir, args):
+    lines = run_statistics(
+        monkeypatch, capsys, "-r", str(results_dir), "-p", "other_.*", *args
+    )
+    if "--raw" in args:
+        assert lines == []
+    else:
+        assert lines[0].startswith(HEADER) and len(lines) == 1
@@ -0,0 +1,97 @@
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from pv056_2019.weka_jvm import FILTERED_CLASSIFIER, PersistentJVM, compile_weka_worker
+
+WEKA_JAR = os.environ.get("WEKA_JAR")
+
+pytestmark = pytest.mark.skipif(
+    not WEKA_JAR or not shutil.which("java") or not shutil.which("javac"),
+    reason="needs java, javac and the path to weka.jar in WEKA_JAR",
+)
+
+
+def write_arff(path, random, n_rows):
+    with open(path, "w") as arff_file:
+        arff_file.write(
+            "@relation test\n"
+            "@attribute ID numeric\n"
+            "@attribute a numeric\n"
+            "@attribute b {x,y,z}\n"
+            "@attribute class {p,q}\n"
+            "@data\n"
+        )
+        for index in range(n_rows):
+            value = random.rand()
+            label = "p" if value + random.rand() / 2 > 0.7 else "q"
+            arff_file.write(
+                "{},{:.4f},{},{}\n".format(
+                    index, value, random.choice(list("xyz")), label
+                )
+            )
+
+
+def weka_args(train_path, test_path, predict_path, distribution):
+    return [
+        "java",
+        "-cp",
+        WEKA_JAR,
+        FILTERED_CLASSIFIER,
+        "-t",
+        train_path,
+        "-T",
+        test_path,
+        "-classifications",
+        "weka.classifiers.evaluation.output.prediction.CSV -p first -file {} -suppress{}".format(
+            predict_path, " -distribution" if distribution else ""
+        ),
+        "-F",
+        'weka.filters.MultiFilter -F "weka.filters.unsupervised.attribute.RemoveByName -E ^ID$"',
+        "-S",
+        "1",
+        "-W",
+        "weka.classifiers.trees.J48",
+        "--",
+        "-C",
+        "0.25",
+    ]
+
+
+@pytest.mark.parametrize("distribution", [False, True])
+def test_persistent_jvm_writes_same_predictions(tmp_path, distribution):
+    random = np.random.RandomState(0)
+    train_path = str(tmp_path / "train.arff")
+    test_path = str(tmp_path / "test.arff")
+    write_arff(train_path, random, 80)
+    write_arff(test_path, random, 30)
+
+    expected_path = str(tmp_path / "expected.csv")
+    subprocess.run(
+        weka_args(train_path, test_path, expected_path, distribution),
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    with open(expected_path) as expected_file:
+        expected = expected_file.read()
+    assert expected.startswith("inst#,actual,predicted,error,")
+
+    class_dir = compile_weka_worker(WEKA_JAR)
+    assert class_dir is not None
+    jvm = PersistentJVM(class_dir)
+    try:
+        # The second run evaluates on the cached test set
+        for run in range(2):
+            predict_path = str(tmp_path / "predictions-{}.csv".format(run))
+            jvm.run(
+                weka_args(train_path, test_path, predict_path, distribution),
+                timeout=120,
+            )
+            with open(predict_path) as predict_file:
+                assert predict_file.read() == expected
+    finally:
+        jvm.close()